@@ -0,0 +1,100 @@
+"""
+Compare the throughput of the code generated by each emitter against an in-process HTTP server.
+
+    python benchmarks/emitter_throughput.py [--requests 2000] [--concurrency 16]
+
+Targets whose client library is not installed are skipped.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from uncurlx.emitters import EMITTERS, emit
+
+LIBRARIES = {"httpx": "httpx", "httpx-async": "httpx", "urllib3": "urllib3", "aiohttp": "aiohttp"}
+BODY = b'{"ok": true}'
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _respond(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load(source: str) -> dict:
+    namespace = {"__name__": "generated"}
+    exec(compile(source, "generated.py", "exec"), namespace)
+    return namespace
+
+
+def run_sync(namespace: dict, requests: int) -> float:
+    client = namespace["make_client"]()
+    namespace["send"](client)  # warm up the connection pool
+    start = time.perf_counter()
+    for _ in range(requests):
+        namespace["send"](client)
+    elapsed = time.perf_counter() - start
+    if hasattr(client, "close"):
+        client.close()
+    return elapsed
+
+
+def run_async(namespace: dict, requests: int, concurrency: int) -> float:
+    async def worker(client, count):
+        for _ in range(count):
+            await namespace["send"](client)
+
+    async def main():
+        async with namespace["make_client"]() as client:
+            await namespace["send"](client)
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(client, requests // concurrency) for _ in range(concurrency)))
+            return time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument("--requests", type=int, default=2000)
+    arguments.add_argument("--concurrency", type=int, default=16)
+    options = arguments.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    curl_command = f"curl 'http://127.0.0.1:{server.server_port}/bench' -H 'Accept: application/json' -d 'a=b'"
+
+    print(f"{'target':<14}{'requests/s':>12}")
+    for target in sorted(EMITTERS):
+        if importlib.util.find_spec(LIBRARIES.get(target, target)) is None:
+            print(f"{target:<14}{'skipped':>12}")
+            continue
+        namespace = load(emit(curl_command, target))
+        if asyncio.iscoroutinefunction(namespace["send"]):
+            requests = options.requests - options.requests % options.concurrency
+            elapsed = run_async(namespace, requests, options.concurrency)
+        else:
+            requests = options.requests
+            elapsed = run_sync(namespace, requests)
+        print(f"{target:<14}{requests / elapsed:>12.0f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
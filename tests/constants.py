@@ -331,11 +331,146 @@ TESTS = [
         name="parse_curl_with_proxy_and_proxy_auth",
         curl_cmd=lambda endpoint: (f"curl '{endpoint}' -U user: -x proxy.python.org:8080"),
         expected=lambda endpoint: (
-            """httpx.get("{}",""".format(endpoint)
+            """client = httpx.Client(mounts={"all://": httpx.HTTPTransport(proxy="http://user:@proxy.python.org:8080")}, trust_env=False)"""
+            + """
+client.get("{}",""".format(endpoint)
+            + """
+    headers={},
+    cookies={},
+)"""
+        ),
+    ),
+    ParametrizedConversion(
+        name="http2_pseudo_headers",
+        curl_cmd=lambda endpoint: (
+            f"curl '{endpoint}' -H ':authority: httpbin.org' -H ':method: GET' -H ':path: /anything' "
+            "-H ':scheme: https' -H 'Accept: */*'"
+        ),
+        expected=lambda endpoint: (
+            """client = httpx.Client(http2=True)
+client.get("{}",""".format(endpoint)
+            + """
+    headers={
+        "Accept": "*/*"
+    },
+    cookies={},
+)"""
+        ),
+    ),
+    ParametrizedConversion(
+        name="post_with_form_fields",
+        curl_cmd=lambda endpoint: (
+            f"curl '{endpoint}' -F 'name=value' -F 'upload=@data/big.bin' "
+            "-F 'report=@report.csv;type=text/csv;filename=latest.csv' -F 'notes=<notes.txt'"
+        ),
+        expected=lambda endpoint: (
+            f"""httpx.post("{endpoint}","""
+            + """
+    files={'name': (None, 'value'), 'upload': open('data/big.bin', 'rb'), 'report': ('latest.csv', open('report.csv', 'rb'), 'text/csv'), 'notes': (None, open('notes.txt', 'rb'))},
+    headers={},
+    cookies={},
+)"""
+        ),
+    ),
+    ParametrizedConversion(
+        name="download_to_output_dir",
+        curl_cmd=lambda endpoint: f"curl '{endpoint}/release.tar.gz' -O --output-dir downloads --create-dirs",
+        expected=lambda endpoint: (
+            """import os
+os.makedirs('downloads', exist_ok=True)
+with httpx.stream("get", "{}/release.tar.gz",""".format(endpoint)
+            + """
+    headers={
+        "Accept-Encoding": "identity"
+    },
+    cookies={},
+) as response:
+    with open('downloads/release.tar.gz', "wb") as output:
+        for chunk in response.iter_raw():
+            output.write(chunk)"""
+        ),
+    ),
+    ParametrizedConversion(
+        name="download_to_path_with_quotes",
+        curl_cmd=lambda endpoint: (
+            f"""curl '{endpoint}/report' --output-dir "it's" -o 'say "hi".csv' --create-dirs --compressed"""
+        ),
+        expected=lambda endpoint: (
+            """import os
+os.makedirs("it's", exist_ok=True)
+with httpx.stream("get", "{}/report",""".format(endpoint)
+            + """
+    headers={},
+    cookies={},
+) as response:
+    with open('it\\'s/say "hi".csv', "wb") as output:
+        for chunk in response.iter_bytes():
+            output.write(chunk)"""
+        ),
+    ),
+    ParametrizedConversion(
+        name="login_with_cookie_jar",
+        curl_cmd=lambda endpoint: f"curl '{endpoint}' -b session.txt -c session.txt -b 'theme=dark'",
+        expected=lambda endpoint: (
+            """import http.cookiejar
+import os
+jar = http.cookiejar.MozillaCookieJar('session.txt')
+if os.path.exists('session.txt'):
+    jar.load('session.txt', ignore_discard=True, ignore_expires=True)
+client = httpx.Client(cookies=jar)
+client.get("{}",""".format(endpoint)
+            + """
+    headers={},
+    cookies={
+        "theme": "dark"
+    },
+)
+jar.save(ignore_discard=True, ignore_expires=True)"""
+        ),
+    ),
+    ParametrizedConversion(
+        name="cookie_jar_paths_with_quotes_and_backslashes",
+        curl_cmd=lambda endpoint: f"""curl '{endpoint}' -b 'C:\\temp\\new.txt' -c 'say "hi".txt'""",
+        expected=lambda endpoint: (
+            """import http.cookiejar
+import os
+jar = http.cookiejar.MozillaCookieJar('say "hi".txt')
+if os.path.exists('C:\\\\temp\\\\new.txt'):
+    jar.load('C:\\\\temp\\\\new.txt', ignore_discard=True, ignore_expires=True)
+client = httpx.Client(cookies=jar)
+client.get("{}",""".format(endpoint)
+            + """
+    headers={},
+    cookies={},
+)
+jar.save(ignore_discard=True, ignore_expires=True)"""
+        ),
+    ),
+    ParametrizedConversion(
+        name="post_json_body",
+        curl_cmd=lambda endpoint: f"""curl '{endpoint}' --json '{{"tags": ["a", "b"], "draft": true}}'""",
+        expected=lambda endpoint: (
+            f"""httpx.post("{endpoint}","""
+            + """
+    json={'tags': ['a', 'b'], 'draft': True},
+    headers={},
+    cookies={},
+)"""
+        ),
+    ),
+    ParametrizedConversion(
+        name="socks_proxy_with_noproxy",
+        curl_cmd=lambda endpoint: (
+            f"curl '{endpoint}' --socks5-hostname tor.local:9050 --noproxy 'localhost,.corp.example.com' -k"
+        ),
+        expected=lambda endpoint: (
+            """client = httpx.Client(mounts={"all://": httpx.HTTPTransport(proxy="socks5h://tor.local:9050", verify=False), """
+            """"all://*localhost": None, "all://*corp.example.com": None}, trust_env=False, verify=False)"""
+            + """
+client.get("{}",""".format(endpoint)
             + """
     headers={},
     cookies={},
-    proxy={'http': 'http://user:@proxy.python.org:8080/', 'https': 'http://user:@proxy.python.org:8080/'},
 )"""
         ),
     ),
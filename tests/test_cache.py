@@ -0,0 +1,181 @@
+import os
+
+import httpx
+import pytest
+
+from uncurlx.cache import CacheStats, CachingTransport, DiskStorage, MemoryStorage, freshness_lifetime
+
+
+class CountingTransport(httpx.BaseTransport):
+    """
+    Send requests to the in-process httpbin app, and keep them to check what reached the server.
+    """
+
+    def __init__(self, app):
+        self.transport = httpx.WSGITransport(app=app)
+        self.requests = []
+
+    def handle_request(self, request):
+        self.requests.append(request)
+        return self.transport.handle_request(request)
+
+
+@pytest.fixture
+def server():
+    httpbin = pytest.importorskip("httpbin")
+    return CountingTransport(httpbin.app)
+
+
+def _client(server, storage=None, stats=None):
+    return httpx.Client(transport=CachingTransport(server, storage, stats or CacheStats()), base_url="http://httpbin")
+
+
+def test_fresh_response_is_served_from_cache(server):
+    stats = CacheStats()
+    with _client(server, stats=stats) as client:
+        first = client.get("/cache/60", headers={"X-Test": "1"})
+        second = client.get("/cache/60", headers={"X-Test": "1"})
+    assert len(server.requests) == 1
+    assert first.extensions["cache_status"] == "miss"
+    assert second.extensions["cache_status"] == "hit"
+    assert second.json() == first.json()
+    assert second.headers["Age"] == "0"
+    assert (stats.hits, stats.misses, stats.stored, stats.hit_rate) == (1, 1, 1, 0.5)
+
+
+def test_etag_is_revalidated(server):
+    stats = CacheStats()
+    with _client(server, stats=stats) as client:
+        first = client.get("/etag/v1")
+        second = client.get("/etag/v1")
+    assert server.requests[1].headers["If-None-Match"] == "v1"
+    assert "If-None-Match" not in second.request.headers
+    assert second.extensions["cache_status"] == "revalidated"
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert (stats.hits, stats.revalidated, stats.misses) == (0, 1, 1)
+
+
+def test_no_cache_request_revalidates_last_modified(server):
+    with _client(server) as client:
+        first = client.get("/cache")
+        second = client.get("/cache", headers={"Cache-Control": "no-cache"})
+    assert server.requests[1].headers["If-Modified-Since"] == first.headers["Last-Modified"]
+    assert second.extensions["cache_status"] == "revalidated"
+    assert second.json() == first.json()
+
+
+@pytest.mark.parametrize(
+    "path, headers",
+    [
+        ("/get", {}),
+        ("/cache/60", {"Cache-Control": "no-store"}),
+        ("/cache/60", {"Range": "bytes=0-10"}),
+    ],
+)
+def test_uncacheable_requests_reach_the_server(server, path, headers):
+    with _client(server) as client:
+        client.get(path, headers=headers)
+        client.get(path, headers=headers)
+    assert len(server.requests) == 2
+
+
+def test_unsafe_request_invalidates_url(server):
+    with _client(server) as client:
+        url = "/response-headers?Cache-Control=max-age%3D60"
+        assert client.get(url).extensions["cache_status"] == "miss"
+        assert client.get(url).extensions["cache_status"] == "hit"
+        client.post(url)
+        response = client.get(url)
+    assert response.extensions["cache_status"] == "miss"
+
+
+def test_memory_storage_evicts_least_recently_used():
+    storage = MemoryStorage(max_bytes=10)
+    assert storage.set("a", {}, b"1234") == 0
+    assert storage.set("b", {}, b"1234") == 0
+    storage.get("a")
+    assert storage.set("c", {}, b"1234") == 1
+    assert storage.get("b") is None
+    assert storage.get("a") == ({}, b"1234")
+    assert storage.size == 8
+    assert storage.set("large", {}, b"12345678901") is None
+    assert storage.get("large") is None
+
+
+def test_oversized_responses_are_not_counted_as_stored(server):
+    stats = CacheStats()
+    with _client(server, MemoryStorage(max_bytes=10), stats) as client:
+        client.get("/cache/60")
+        client.get("/cache/60")
+    assert (stats.misses, stats.stored) == (2, 0)
+
+
+class ChunkedTransport(httpx.BaseTransport):
+    """
+    Answer with a cacheable body of `count` chunks and no Content-Length, counting the chunks read so far.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.read = 0
+
+    def _chunks(self):
+        for _ in range(self.count):
+            self.read += 1
+            yield b"1234"
+
+    def handle_request(self, request):
+        return httpx.Response(200, headers={"Cache-Control": "max-age=60"}, content=self._chunks())
+
+
+def test_large_bodies_are_streamed_through():
+    stats = CacheStats()
+    server = ChunkedTransport(count=10)
+    with _client(server, MemoryStorage(max_bytes=10), stats) as client:
+        with client.stream("GET", "/large") as response:
+            # only the chunks needed to pass max_bytes were buffered
+            assert server.read == 3
+            assert b"".join(response.iter_bytes()) == b"1234" * 10
+        assert client.get("/large").extensions.get("cache_status") is None
+    assert (stats.misses, stats.stored) == (2, 0)
+
+
+def test_disk_storage_persists_across_runs(server, tmp_path):
+    directory = str(tmp_path / "cache")
+    with _client(server, DiskStorage(directory)) as client:
+        client.get("/cache/60")
+        client.get("/etag/v1")
+    assert len(os.listdir(directory)) == 2
+
+    storage = DiskStorage(directory)
+    assert storage.size == sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    with _client(server, storage) as client:
+        response = client.get("/cache/60")
+    assert response.extensions["cache_status"] == "hit"
+    assert len(server.requests) == 2
+
+    # /etag/v1 was used least recently; the metadata holds a timestamp, so entry sizes vary by a few bytes across runs
+    sizes = sorted(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    stats = CacheStats()
+    with _client(server, DiskStorage(directory, max_bytes=sizes[1] + sizes[0] // 2), stats) as client:
+        client.get("/cache/60")
+        client.get("/etag/v1")
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.evicted == 1
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"Cache-Control": "public, max-age=60"}, 60),
+        ({"Cache-Control": "max-age=60, no-cache"}, 0),
+        ({"Date": "Mon, 19 Oct 2026 10:00:00 GMT", "Expires": "Mon, 19 Oct 2026 10:05:00 GMT"}, 300),
+        ({"Expires": "0"}, 0),
+        ({"Date": "Mon, 19 Oct 2026 10:00:00 GMT", "Last-Modified": "Mon, 19 Oct 2026 09:00:00 GMT"}, 360),
+        ({"ETag": "v1"}, 0),
+    ],
+)
+def test_freshness_lifetime(headers, expected):
+    assert freshness_lifetime(httpx.Headers(headers), stored_at=0) == pytest.approx(expected)
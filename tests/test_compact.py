@@ -0,0 +1,45 @@
+import pytest
+
+import uncurlx
+from tests.constants import ENDPOINT, TESTS, ParametrizedConversion
+from uncurlx.compact import CompactContext, parse_compact
+
+
+def _curl_cmd(test: ParametrizedConversion) -> str:
+    curl_cmd = test.with_endpoint(ENDPOINT).curl_cmd
+    return curl_cmd[0] if isinstance(curl_cmd, tuple) else curl_cmd
+
+
+@pytest.mark.parametrize("test", TESTS)
+def test_compact_round_trip(test: ParametrizedConversion):
+    parsed_context = uncurlx.parse_context(_curl_cmd(test))
+    compact = CompactContext.from_context(parsed_context)
+    assert compact.to_context() == parsed_context
+    assert type(compact.to_context().headers) is type(parsed_context.headers)
+
+
+def test_compact_context_is_slotted():
+    compact = parse_compact(f"curl '{ENDPOINT}' -H 'Accept: */*'")
+    assert not hasattr(compact, "__dict__")
+    with pytest.raises(AttributeError):
+        compact.extra = True
+
+
+def test_compact_context_interns_header_names_and_methods():
+    first = parse_compact(f"curl '{ENDPOINT}' -X POST -H 'X-Request-Source: a'")
+    second = parse_compact(f"curl '{ENDPOINT}/other' -X POST -H 'X-Request-Source: b'")
+    assert first.header_names[0] is second.header_names[0]
+    assert first.method is second.method
+    assert list(second.headers()) == [("X-Request-Source", "b")]
+
+
+def test_compact_context_keeps_repeated_headers_as_list():
+    compact = parse_compact(f"curl '{ENDPOINT}' -H 'Accept: text/html' -H 'Accept: */*' -H 'Cookie: a=b'")
+    assert compact.header_names == ("Accept", "Accept")
+    assert compact.to_context().headers == [("Accept", "text/html"), ("Accept", "*/*")]
+    assert dict(compact.cookies()) == {"a": "b"}
+
+
+def test_compact_context_requires_parallel_headers():
+    with pytest.raises(ValueError):
+        CompactContext(method="get", url=ENDPOINT, header_names=("Accept",), header_values=())
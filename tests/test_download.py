@@ -0,0 +1,128 @@
+import httpx
+import pytest
+
+from uncurlx.download import parse_byte_range, parse_download
+
+
+@pytest.fixture
+def httpx_client():
+    httpbin = pytest.importorskip("httpbin")
+    return httpx.Client(transport=httpx.WSGITransport(app=httpbin.app))
+
+
+def _load_script(source: str) -> dict:
+    namespace = {"__name__": "generated_download"}
+    exec(compile(source, "generated_download.py", "exec"), namespace)
+    return namespace
+
+
+@pytest.mark.parametrize(
+    "range_header, expected",
+    [
+        (None, (0, None)),
+        ("bytes=0-499", (0, 499)),
+        ("bytes=100-", (100, None)),
+        ("bytes=-100", (-100, None)),
+    ],
+)
+def test_parse_byte_range(range_header, expected):
+    assert parse_byte_range(range_header) == expected
+
+
+def test_parse_byte_range_rejects_multiple_ranges():
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=0-1, 5-6")
+
+
+def test_parse_download_rejects_requests_with_body():
+    with pytest.raises(ValueError):
+        parse_download("curl 'http://localhost:8000/anything' --data-binary 'payload'")
+
+
+@pytest.mark.parametrize(
+    "options",
+    ["-b cookies.txt", "-c cookies.txt", "--unix-socket /tmp/socket"],
+)
+def test_parse_download_rejects_unsupported_options(options):
+    with pytest.raises(ValueError):
+        parse_download(f"curl 'http://localhost:8000/range/1000' {options}")
+
+
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        ("-x user:pw@proxy:3128", "'proxy': 'http://user:pw@proxy:3128'"),
+        ("-x socks5h://proxy", "'proxy': 'socks5h://proxy:1080'"),
+        ("-x proxy:3128 --noproxy localhost", "CLIENT_OPTIONS = {'trust_env': False}"),
+    ],
+)
+def test_parse_download_proxy(options, expected):
+    assert expected in parse_download(f"curl 'http://localhost:8000/range/1000' {options}")
+
+
+@pytest.mark.parametrize(
+    "curl_cmd, expected",
+    [
+        (
+            "curl 'http://localhost:8000/range/1000' -H 'Accept-Encoding: gzip'",
+            bytes(range(97, 123)) * 38 + b"abcdefghijkl",
+        ),
+        ("curl 'http://localhost:8000/range/1000' -r 100-149", (bytes(range(97, 123)) * 38)[100:150]),
+        ("curl 'http://localhost:8000/range/1000' -r -10", b"cdefghijkl"),
+    ],
+)
+def test_download_script(curl_cmd, expected, httpx_client, tmp_path):
+    output = tmp_path / "range.bin"
+    script = _load_script(parse_download(curl_cmd, output=str(output), chunks=3))
+    with httpx_client as client:
+        written = script["download"](client)
+    assert written == len(expected)
+    assert output.read_bytes() == expected
+    assert not (tmp_path / "range.bin.progress").exists()
+
+
+@pytest.mark.parametrize(
+    "previous_chunks, expected",
+    [
+        (4, [50, 75]),
+        # a progress file of a run with other spans is ignored
+        (2, [0, 25, 50, 75]),
+    ],
+)
+def test_download_script_resumes(previous_chunks, expected, httpx_client, tmp_path):
+    output = tmp_path / "range.bin"
+    curl_cmd = "curl 'http://localhost:8000/range/100'"
+    previous = _load_script(parse_download(curl_cmd, output=str(output), chunks=previous_chunks))
+    output.write_bytes(b"\0" * 100)
+    previous["save_progress"](100, previous["chunk_spans"](100), {0, 1})
+
+    script = _load_script(parse_download(curl_cmd, output=str(output), chunks=4))
+    requested = []
+    original_fetch_chunk = script["fetch_chunk"]
+    script["fetch_chunk"] = lambda client, start, end, offset: (
+        requested.append(start),
+        original_fetch_chunk(client, start, end, offset),
+    )
+    with httpx_client as client:
+        script["download"](client)
+    assert sorted(requested) == expected
+    assert output.read_bytes()[50:] == (bytes(range(97, 123)) * 4)[50:100]
+
+
+def test_download_script_asks_for_identity_encoding(tmp_path):
+    requests = []
+
+    def handler(request):
+        # no Accept-Ranges on the HEAD response, so the size comes from the 0-0 range probe
+        requests.append(request)
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"Content-Length": "4"})
+        return httpx.Response(206, headers={"Content-Range": "bytes 0-0/10"}, content=b"a")
+
+    script = _load_script(parse_download("curl 'http://localhost:8000/file'", output=str(tmp_path / "file")))
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        assert script["content_length"](client) == 10
+    assert [(request.method, request.headers["Accept-Encoding"]) for request in requests] == [
+        ("HEAD", "identity"),
+        ("GET", "identity"),
+    ]
@@ -0,0 +1,301 @@
+import ast
+import asyncio
+import json
+import threading
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import httpx
+import pytest
+
+from uncurlx import parse, parse_via_ast
+from uncurlx.emitters import EMITTERS, emit
+
+LIBRARIES = {"httpx": "httpx", "httpx-async": "httpx", "urllib3": "urllib3", "aiohttp": "aiohttp"}
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    httpbin = pytest.importorskip("httpbin")
+    server = make_server("127.0.0.1", 0, httpbin.app, handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _run(source: str) -> tuple:
+    """
+    Execute a generated module and return the status code and body of its response.
+    """
+    namespace = {"__name__": "generated"}
+    exec(compile(source, "generated.py", "exec"), namespace)
+    make_client, send = namespace["make_client"], namespace["send"]
+    if not asyncio.iscoroutinefunction(send):
+        response = send(make_client())
+        if hasattr(response, "status_code"):
+            return response.status_code, response.content
+        return response.status, response.data
+
+    async def main():
+        async with make_client() as client:
+            response = await send(client)
+            if hasattr(response, "status_code"):
+                return response.status_code, response.content
+            return response.status, await response.read()
+
+    return asyncio.run(main())
+
+
+def test_registry_has_builtin_targets():
+    assert {"httpx", "httpx-async", "urllib3", "aiohttp"} <= set(EMITTERS)
+
+
+def test_emit_unknown_target():
+    with pytest.raises(ValueError):
+        emit("curl 'https://example.org'", target="pycurl")
+
+
+@pytest.mark.parametrize("target", sorted(LIBRARIES))
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        ("--data-binary 'payload'", {"method": "POST", "form": {"payload": ""}}),
+        ("""--json '{"a": [1, 2]}'""", {"method": "POST", "json": {"a": [1, 2]}}),
+        ("-F 'name=value' -F 'other=second'", {"method": "POST", "form": {"name": "value", "other": "second"}}),
+        ("-X DELETE", {"method": "DELETE"}),
+    ],
+)
+def test_emitted_code_round_trip(target, options, expected, server_url):
+    pytest.importorskip(LIBRARIES[target])
+    source = emit(f"curl '{server_url}/anything' -H 'X-Test: 1' -H 'Cookie: a=b' -u user:pw {options}", target)
+    ast.parse(source)
+    status, body = _run(source)
+    assert status == 200
+    echoed = json.loads(body)
+    assert echoed["headers"]["X-Test"] == "1"
+    assert echoed["headers"]["Cookie"] == "a=b"
+    assert echoed["headers"]["Authorization"] == "Basic dXNlcjpwdw=="
+    for key, value in expected.items():
+        assert echoed[key] == value
+
+
+def _run_main(source: str, tmp_path, monkeypatch) -> None:
+    """
+    Run a generated module as a script from `tmp_path`.
+    """
+    monkeypatch.chdir(tmp_path)
+    with warnings.catch_warnings():
+        # -b name=value cookies are sent per request next to a cookie jar, which httpx deprecates
+        warnings.simplefilter(action="ignore", category=DeprecationWarning)
+        exec(compile(source, "generated.py", "exec"), {"__name__": "__main__"})
+
+
+@pytest.mark.parametrize("target", sorted(LIBRARIES))
+@pytest.mark.parametrize("compressed", [False, True])
+def test_emitted_code_streams_to_output(target, compressed, server_url, tmp_path, monkeypatch, capsys):
+    pytest.importorskip(LIBRARIES[target])
+    options = "-o out/range.bin --create-dirs" + (" --compressed" if compressed else "")
+    source = emit(f"curl '{server_url}/range/100000' {options}", target)
+    ast.parse(source)
+    _run_main(source, tmp_path, monkeypatch)
+    assert (tmp_path / "out" / "range.bin").read_bytes() == (bytes(range(97, 123)) * 3847)[:100000]
+    assert capsys.readouterr().out == "200 saved to out/range.bin\n"
+
+
+@pytest.mark.parametrize("target", ["httpx", "httpx-async"])
+def test_emitted_code_shares_cookie_jar(target, server_url, tmp_path, monkeypatch, capsys):
+    login = emit(f"curl '{server_url}/cookies/set?session=abc' -c cookies.txt", target)
+    _run_main(login, tmp_path, monkeypatch)
+    assert "\tsession\tabc" in (tmp_path / "cookies.txt").read_text()
+    assert capsys.readouterr().out.startswith("302 ")
+
+    fetch = emit(f"curl '{server_url}/cookies' -b cookies.txt -b 'other=1'", target)
+    _run_main(fetch, tmp_path, monkeypatch)
+    status, body = capsys.readouterr().out.split(" ", 1)
+    assert status == "200"
+    assert json.loads(body) == {"cookies": {"other": "1", "session": "abc"}}
+
+
+@pytest.mark.parametrize("target", ["urllib3", "aiohttp"])
+@pytest.mark.parametrize("options", ["-b cookies.txt", "-c cookies.txt"])
+def test_emitters_reject_cookie_files(target, options):
+    with pytest.raises(ValueError, match="cookie files"):
+        emit(f"curl 'http://localhost/' {options}", target)
+
+
+def test_urllib3_rejects_unix_socket():
+    with pytest.raises(ValueError):
+        emit("curl 'http://localhost/' --unix-socket /tmp/socket", "urllib3")
+
+
+def test_emit_rejects_unsupported_option():
+    with pytest.raises(ValueError):
+        emit("curl 'https://example.org'", "urllib3", instrument=True)
+
+
+@pytest.mark.parametrize("target", ["httpx", "httpx-async"])
+def test_instrumented_client_logs_timings(target, server_url, monkeypatch, capsys):
+    import atexit
+
+    exit_handlers = []
+    monkeypatch.setattr(atexit, "register", exit_handlers.append)
+    source = emit(f"curl '{server_url}/bytes/512' -H 'X-Test: 1'", target, instrument=True)
+    namespace = {"__name__": "generated"}
+    exec(compile(source, "generated.py", "exec"), namespace)
+    make_client, send = namespace["make_client"], namespace["send"]
+    if asyncio.iscoroutinefunction(send):
+
+        async def main():
+            async with make_client() as client:
+                return await send(client)
+
+        response = asyncio.run(main())
+    else:
+        with make_client() as client:
+            response = send(client)
+    assert response.status_code == 200
+    assert len(response.content) == 512
+
+    line = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert line["method"] == "GET"
+    assert line["status"] == 200
+    assert line["response_bytes"] == 512
+    assert {"connect", "send", "ttfb", "download", "total"} <= set(line["timings_ms"])
+    assert namespace["TIMINGS"]["total"]
+
+    assert exit_handlers == [namespace["print_summary"]]
+    namespace["print_summary"]()
+    summary = capsys.readouterr().err.splitlines()
+    assert summary[0].split() == ["phase", "count", "p50", "ms", "p90", "ms", "p99", "ms", "max", "ms"]
+    assert any(row.startswith("total") for row in summary[1:])
+
+
+@pytest.mark.parametrize("target", ["httpx", "httpx-async"])
+def test_instrumented_client_keeps_downloads_streamed(target, server_url, tmp_path, monkeypatch, capsys):
+    import atexit
+
+    monkeypatch.setattr(atexit, "register", lambda handler: None)
+    source = emit(f"curl '{server_url}/stream-bytes/100000?chunk_size=1000' -o out.bin", target, instrument=True)
+    _run_main(source, tmp_path, monkeypatch)
+    assert len((tmp_path / "out.bin").read_bytes()) == 100000
+    line = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert line["response_bytes"] == 100000
+    assert line["timings_ms"]["download"] > 0
+
+
+@pytest.mark.parametrize("target", ["httpx", "httpx-async"])
+@pytest.mark.parametrize("storage", ["memory", "disk"])
+def test_cached_client_serves_repeated_requests(target, storage, server_url, tmp_path, monkeypatch, capsys):
+    import atexit
+
+    exit_handlers = []
+    monkeypatch.setattr(atexit, "register", exit_handlers.append)
+    options = {"cache_dir": str(tmp_path / "cache")} if storage == "disk" else {"cache": True}
+    source = emit(f"curl '{server_url}/cache/60' -H 'X-Test: 1'", target, **options)
+    namespace = {"__name__": "generated"}
+    exec(compile(source, "generated.py", "exec"), namespace)
+    make_client, send = namespace["make_client"], namespace["send"]
+    if asyncio.iscoroutinefunction(send):
+
+        async def main():
+            async with make_client() as client:
+                return [await send(client), await send(client)]
+
+        responses = asyncio.run(main())
+    else:
+        with make_client() as client:
+            responses = [send(client), send(client)]
+    assert [response.extensions["cache_status"] for response in responses] == ["miss", "hit"]
+    assert responses[1].json()["headers"]["X-Test"] == "1"
+    if storage == "disk":
+        assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    assert exit_handlers == [namespace["print_cache_summary"]]
+    namespace["print_cache_summary"]()
+    assert capsys.readouterr().err.startswith("# cache: 2 lookups, 1 hits, 0 revalidated, 1 misses")
+
+
+class RecordingProxyHandler(BaseHTTPRequestHandler):
+    """
+    A forward proxy that answers every request itself, with the target URL and proxy credentials it received.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"proxied": self.path, "auth": self.headers.get("Proxy-Authorization")}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def proxy_address():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingProxyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _set_proxy_environment(monkeypatch) -> None:
+    # a proxy refusing connections, which the generated clients must not pick up once the command sets its own proxy
+    for name in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY"):
+        monkeypatch.setenv(name, "http://127.0.0.1:9")
+
+
+@pytest.mark.parametrize("target", sorted(LIBRARIES))
+def test_emitted_code_uses_proxy(target, server_url, proxy_address, monkeypatch):
+    pytest.importorskip(LIBRARIES[target])
+    _set_proxy_environment(monkeypatch)
+    status, body = _run(emit(f"curl '{server_url}/anything' -x {proxy_address} -U user:pw", target))
+    assert status == 200
+    assert json.loads(body) == {"proxied": f"{server_url}/anything", "auth": "Basic dXNlcjpwdw=="}
+
+    status, body = _run(emit(f"curl '{server_url}/anything' -x {proxy_address} --noproxy 127.0.0.1", target))
+    assert json.loads(body)["url"] == f"{server_url}/anything"
+
+
+@pytest.mark.parametrize("convert", [parse, parse_via_ast], ids=["parse", "parse_via_ast"])
+def test_converted_code_ignores_proxy_environment(convert, server_url, proxy_address, monkeypatch):
+    _set_proxy_environment(monkeypatch)
+    for options, expected in [
+        (f"-x {proxy_address}", {"proxied": f"{server_url}/anything", "auth": None}),
+        (f"-x {proxy_address} --noproxy '*'", {"url": f"{server_url}/anything"}),
+    ]:
+        namespace = {"httpx": httpx}
+        source = convert(f"curl '{server_url}/anything' {options}")
+        with warnings.catch_warnings():
+            # the converted request passes cookies={} next to the client, which httpx deprecates
+            warnings.simplefilter(action="ignore", category=DeprecationWarning)
+            exec(source.replace("client.get(", "response = client.get(", 1), namespace)
+        echoed = namespace["response"].json()
+        assert {key: echoed[key] for key in expected} == expected
+
+
+def test_httpx_emitter_mounts_proxy_transports():
+    source = emit("curl 'https://example.org/' -x socks5h://tor:9050 --noproxy 'internal.example,10.0.0.1' -k")
+    assert 'PROXY = "socks5h://tor:9050"' in source.replace("'", '"')
+    assert (
+        'mounts={"all://": httpx.HTTPTransport(proxy=PROXY, verify=False), '
+        '"all://*internal.example": None, "all://10.0.0.1": None}'
+    ) in source
+
+
+def test_aiohttp_rejects_socks_proxy():
+    with pytest.raises(ValueError):
+        emit("curl 'https://example.org/' --socks5 tor:9050", "aiohttp")
@@ -1,4 +1,5 @@
 import ast
+import json
 import shlex
 from unittest.mock import patch
 
@@ -45,3 +46,122 @@ httpx.get("https://pypi.python.org/pypi/uncurlx",
             )
         )
     )
+
+
+def test_main_download_option(printer, fake_sys):
+    fake_sys.argv = [
+        "uncurlx",
+        "--download",
+        "--chunks",
+        "4",
+        *shlex.split("curl 'https://example.org/files/archive.tar' -r 0-1023"),
+    ]
+    main()
+
+    output = printer.call_args.args[0]
+    ast.parse(output)
+    assert "CHUNKS = 4" in output
+    assert "OUTPUT = 'archive.tar'" in output
+    assert "LAST_BYTE = 1023" in output
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--format", "jsonl"],
+        ["--target", "urllib3"],
+        ["--timing"],
+        ["--cache"],
+        ["--cache-dir", "cache"],
+    ],
+)
+def test_main_download_rejects_ignored_options(options, printer, fake_sys, capsys):
+    fake_sys.argv = ["uncurlx", "--download", *options, "curl", "https://example.org/archive.tar"]
+    with pytest.raises(SystemExit):
+        main()
+    printer.assert_not_called()
+    assert f"{options[0]} " in capsys.readouterr().err
+
+
+def test_main_scan(printer, fake_sys, tmp_path):
+    history = tmp_path / ".bash_history"
+    history.write_text("ls\ncurl 'https://example.org' -H 'Accept: */*'\n")
+    fake_sys.argv = ["uncurlx", "scan", str(history), "--processes", "1"]
+    main()
+
+    printer.assert_called_once_with(
+        f"# {history}:2\nhttpx.get('https://example.org', headers={{'Accept': '*/*'}}, cookies={{}})\n"
+    )
+
+
+def test_main_scan_skips_unreadable_files(printer, fake_sys, tmp_path):
+    (tmp_path / "broken").symlink_to(tmp_path / "missing")
+    (tmp_path / "history").write_text("curl 'https://example.org'\n")
+    fake_sys.argv = ["uncurlx", "scan", str(tmp_path), "--processes", "1"]
+    main()
+
+    assert printer.call_args_list[0].args == (f"# {tmp_path / 'broken'}: skipped: No such file or directory",)
+    assert printer.call_args_list[0].kwargs == {"file": fake_sys.stderr}
+    assert printer.call_args_list[1].args[0].startswith(f"# {tmp_path / 'history'}:1\n")
+
+
+def test_main_jsonl_format(printer, fake_sys):
+    fake_sys.argv = ["uncurlx", "--format", "jsonl", *shlex.split("curl 'https://example.org' -H 'Accept: */*'")]
+    main()
+
+    (line,) = printer.call_args.args
+    assert json.loads(line)["headers"] == [["Accept", "*/*"]]
+
+
+def test_main_target_option(printer, fake_sys):
+    fake_sys.argv = ["uncurlx", "--target", "urllib3", *shlex.split("curl 'https://example.org' -H 'Accept: */*'")]
+    main()
+
+    output = printer.call_args.args[0]
+    ast.parse(output)
+    assert "urllib3.PoolManager(" in output
+
+
+def test_main_timing_option(printer, fake_sys):
+    fake_sys.argv = ["uncurlx", "--timing", *shlex.split("curl 'https://example.org'")]
+    main()
+
+    output = printer.call_args.args[0]
+    ast.parse(output)
+    assert "httpx.Client(" in output
+    assert 'event_hooks={"request": [start_timer], "response": [finish_timer]}' in output
+
+
+def test_main_cache_option(printer, fake_sys):
+    fake_sys.argv = ["uncurlx", "--cache-dir", ".cache", *shlex.split("curl 'https://example.org' -k")]
+    main()
+
+    output = printer.call_args.args[0]
+    ast.parse(output)
+    assert "CACHE_STORAGE = DiskStorage('.cache')" in output
+    assert "transport=CachingTransport(httpx.HTTPTransport(verify=False), CACHE_STORAGE)" in output
+
+
+def test_main_package(printer, fake_sys, tmp_path):
+    script = tmp_path / "deploy.sh"
+    script.write_text("curl 'https://api.example.com/v1/items'\ncurl 'https://cdn.example.com/logo.png' -o logo.png\n")
+    fake_sys.argv = ["uncurlx", "package", str(tmp_path / "captured"), str(script), "--processes", "1"]
+    main()
+
+    printer.assert_called_once_with(f"# wrote 2 modules to {tmp_path / 'captured'}")
+    assert sorted(path.name for path in (tmp_path / "captured").iterdir()) == [
+        "__init__.py",
+        "api_example_com.py",
+        "cdn_example_com.py",
+    ]
+
+
+def test_main_verify(fake_sys, tmp_path):
+    script = tmp_path / "deploy.sh"
+    script.write_text("curl 'https://api.example.com/v1/items' -H 'Accept: */*'\ncurl 'https://example.org' -d 'a=1'\n")
+    fake_sys.argv = ["uncurlx", "verify", str(script), "--processes", "1"]
+    assert main() == 0
+
+    summary = fake_sys.stdout.write.call_args_list[0].args[0]
+    assert summary.startswith("# verified 2 requests in ")
+    assert summary.endswith("2 equivalent, 0 different, 0 failed")
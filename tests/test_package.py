@@ -0,0 +1,82 @@
+import ast
+import importlib
+import sys
+import warnings
+
+import pytest
+
+from uncurlx.api import parse_context
+from uncurlx.package import build_package, function_name, shard_name, write_package
+
+COMMANDS = [
+    "curl 'http://localhost:8000/anything/users' -H 'X-Test: 1'",
+    """curl 'http://localhost:8000/anything/users' --json '{"name": "a"}'""",
+    "curl 'http://localhost:8000/anything/users' -H 'X-Test: 2'",
+    "curl 'http://localhost:8000/status/204' -X DELETE",
+    "curl 'https://api.example.com/v1/items?page=2'",
+]
+
+
+@pytest.mark.parametrize(
+    "url, group_by, expected",
+    [
+        ("https://api.example.com/v1/items", "host", "api_example_com"),
+        ("https://api.example.com/v1/items", "path", "api_example_com_v1"),
+        ("http://127.0.0.1:8000/", "path", "host_127_0_0_1"),
+    ],
+)
+def test_shard_name(url, group_by, expected):
+    assert shard_name(url, group_by) == expected
+
+
+def test_function_name():
+    assert function_name(parse_context("curl 'https://example.org/a-b/c.json' -X PUT")) == "put_a_b_c_json"
+    assert function_name(parse_context("curl 'https://example.org/'")) == "get"
+
+
+def test_build_package():
+    files = build_package(map(parse_context, COMMANDS), group_by="path")
+    assert sorted(files) == ["__init__.py", "api_example_com_v1.py", "localhost_anything.py", "localhost_status.py"]
+    for source in files.values():
+        ast.parse(source)
+    index = ast.literal_eval(files["__init__.py"].split("_INDEX = ")[1].split("\n\n")[0])
+    assert index == {
+        "get_anything_users": "localhost_anything",
+        "post_anything_users": "localhost_anything",
+        "get_anything_users_2": "localhost_anything",
+        "delete_status_204": "localhost_status",
+        "get_v1_items": "api_example_com_v1",
+    }
+
+
+def test_build_package_rejects_unknown_grouping():
+    with pytest.raises(ValueError):
+        build_package([], group_by="method")
+
+
+def test_package_is_imported_lazily(tmp_path, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    httpbin = pytest.importorskip("httpbin")
+    write_package(map(parse_context, COMMANDS), str(tmp_path / "captured"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    package = importlib.import_module("captured")
+    assert "captured.localhost" not in sys.modules
+    assert "get_anything_users_2" in dir(package)
+    with pytest.raises(AttributeError):
+        package.missing
+
+    get_users = package.get_anything_users_2
+    assert "captured.localhost" in sys.modules
+    assert "captured.api_example_com" not in sys.modules
+    monkeypatch.setattr(
+        sys.modules["captured.localhost"], "httpx", httpx.Client(transport=httpx.WSGITransport(app=httpbin.app))
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter(action="ignore", category=DeprecationWarning)
+        response = get_users()
+        status = package.delete_status_204().status_code
+    assert response.json()["headers"]["X-Test"] == "2"
+    assert status == 204
+    for name in ("captured", "captured.localhost"):
+        sys.modules.pop(name)
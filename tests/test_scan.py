@@ -0,0 +1,121 @@
+import pytest
+
+import uncurlx.scan
+from uncurlx.scan import LINE_COUNT_WINDOW, extract_command, find_commands, scan_file, scan_paths, split_file
+
+SCRIPT = b"""#!/bin/bash
+set -e
+curl -s 'https://example.org/api?a=1&b=2' \\
+  -H 'Accept: application/json' \\
+  -H "X-Token: $TOKEN" | jq .
+echo done; curl -X POST https://example.org/hook --data-binary 'it'"'"'s done' > /dev/null
+RUN curl $'https://example.org/\\'quoted' # a comment
+curl-config --libs
+curl 'https://example.org/unterminated
+curl https://example.org/last
+"""
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (b"curl https://example.org", b"curl https://example.org"),
+        (b"curl https://example.org | jq .", b"curl https://example.org"),
+        (b"curl 'https://example.org/a;b' ; ls", b"curl 'https://example.org/a;b'"),
+        (b"curl https://example.org \\\n  -H 'A: b'\nls", b"curl https://example.org   -H 'A: b'"),
+        (b'curl "https://example.org/\\"a\\"" && ls', b'curl "https://example.org/\\"a\\""'),
+        (b"curl https://example.org/#anchor # comment", b"curl https://example.org/#anchor"),
+        (b"curl $'a\\nb'", b"curl 'a\nb'"),
+    ],
+)
+def test_extract_command(text, expected):
+    command, end = extract_command(text, 0)
+    assert command == expected
+
+
+def test_extract_command_unterminated_quote():
+    assert extract_command(b"curl 'https://example.org\nls", 0) == (None, 0)
+
+
+def test_find_commands():
+    commands = list(find_commands(SCRIPT))
+    assert [line for line, _ in commands] == [3, 6, 7, 10]
+    assert commands[1][1] == b"curl -X POST https://example.org/hook --data-binary 'it'\"'\"'s done'"
+
+
+def test_scan_file(tmp_path):
+    script = tmp_path / "deploy.sh"
+    script.write_bytes(SCRIPT)
+    results = list(scan_file(str(script)))
+    assert [result.line for result in results] == [3, 6, 7, 10]
+    assert all(result.error is None for result in results)
+    assert results[0].context.url == "https://example.org/api?a=1&b=2"
+    assert results[0].context.headers == {"Accept": "application/json", "X-Token": "$TOKEN"}
+    assert results[1].context.content == "it's done"
+    assert results[2].context.url == "https://example.org/'quoted"
+    assert results[3].code == "httpx.get('https://example.org/last', headers={}, cookies={})"
+
+
+def test_scan_file_reports_invalid_commands(tmp_path):
+    log = tmp_path / "history"
+    log.write_bytes(b"curl --data a --form b=c https://example.org\n")
+    (result,) = scan_file(str(log))
+    assert result.context is None
+    assert result.error
+
+
+def test_scan_paths_in_parallel(tmp_path):
+    for index in range(3):
+        (tmp_path / f"{index}.log").write_bytes(f"$ curl https://example.org/{index}\n".encode())
+    (tmp_path / "empty.log").write_bytes(b"")
+    results = list(scan_paths([str(tmp_path)], processes=2, generate_code=False))
+    assert [result.context.url for result in results] == [f"https://example.org/{index}" for index in range(3)]
+    assert all(result.code is None for result in results)
+
+
+def test_scan_paths_reports_unreadable_files(tmp_path):
+    (tmp_path / "a.log").write_bytes(b"curl https://example.org/a\n")
+    (tmp_path / "b.log").symlink_to(tmp_path / "missing.log")
+    (tmp_path / "c.log").write_bytes(b"curl https://example.org/c\n")
+    results = list(scan_paths([str(tmp_path)], processes=1, generate_code=False))
+    assert [(result.path, result.line) for result in results] == [
+        (str(tmp_path / "a.log"), 1),
+        (str(tmp_path / "b.log"), None),
+        (str(tmp_path / "c.log"), 1),
+    ]
+    assert results[1].error == "No such file or directory"
+    assert results[1].context is None
+
+
+def test_scan_file_counts_lines_across_windows(tmp_path):
+    log = tmp_path / "build.log"
+    log.write_bytes(b"curl https://example.org/1\n" + b"x" * LINE_COUNT_WINDOW + b"\n" * 70000 + b"curl https://a\n")
+    assert [result.line for result in scan_file(str(log))] == [1, 70002]
+    assert [line for line, _ in find_commands(log.read_bytes())] == [1, 70002]
+
+
+def test_find_commands_skips_other_words():
+    assert list(find_commands(b"libcurl https://a\n/usr/bin/curl https://b")) == [(2, b"curl https://b")]
+
+
+def test_split_file(tmp_path):
+    log = tmp_path / "build.log"
+    log.write_bytes(b"0123456789\n" * 10)
+    assert split_file(str(log), 25) == [(0, 33), (33, 66), (66, 99), (99, 110)]
+    assert split_file(str(log), 200) == [(0, 110)]
+
+
+@pytest.mark.parametrize("range_bytes", [20, 31, 47, 64])
+def test_scan_paths_splits_large_files(range_bytes, tmp_path, monkeypatch):
+    log = tmp_path / "build.log"
+    lines = [b"curl https://example.org/%d" % index for index in range(20)]
+    # a command continued over lines that can start a range, with a curl word in its arguments
+    lines[5:5] = [b"curl https://example.org/long \\", b"  -d curl https://example.org/bogus \\", b"  -H 'X: 1'"]
+    log.write_bytes(b"\n".join(lines) + b"\n")
+    monkeypatch.setattr(uncurlx.scan, "RANGE_BYTES", range_bytes)
+    assert len(split_file(str(log), range_bytes)) > 5
+    results = list(scan_paths([str(log)], processes=2, generate_code=False))
+    assert [(result.line, result.command) for result in results] == [
+        (result.line, result.command) for result in scan_file(str(log), generate_code=False)
+    ]
+    assert [result.line for result in results][4:7] == [5, 6, 9]
@@ -0,0 +1,112 @@
+import io
+import json
+
+import pytest
+
+import uncurlx
+from tests.constants import ENDPOINT, TESTS, ParametrizedConversion
+from uncurlx.serialize import (
+    SCHEMA_VERSION,
+    context_from_dict,
+    context_to_dict,
+    dump_jsonl,
+    iter_jsonl,
+    parse_jsonl,
+)
+
+
+def _curl_cmd(test: ParametrizedConversion) -> str:
+    curl_cmd = test.with_endpoint(ENDPOINT).curl_cmd
+    return curl_cmd[0] if isinstance(curl_cmd, tuple) else curl_cmd
+
+
+@pytest.mark.parametrize("test", TESTS)
+def test_serialize_round_trip(test: ParametrizedConversion):
+    parsed_context = uncurlx.parse_context(_curl_cmd(test))
+    data = json.loads(json.dumps(context_to_dict(parsed_context)))
+    assert context_from_dict(data) == parsed_context
+
+
+def test_context_to_dict():
+    parsed_context = uncurlx.parse_context(
+        f"curl '{ENDPOINT}' -H 'Accept: */*' -H 'Accept: text/html' -H 'Cookie: a=b' --data-binary 'héllo' -u user:pw"
+    )
+    assert context_to_dict(parsed_context, source={"path": "history", "line": 3}) == {
+        "version": SCHEMA_VERSION,
+        "method": "POST",
+        "url": ENDPOINT,
+        "headers": [["Accept", "*/*"], ["Accept", "text/html"], ["Content-Type", "application/x-www-form-urlencoded"]],
+        "cookies": {"a": "b"},
+        "content_base64": "aMOpbGxv",
+        "json": None,
+        "form": [],
+        "auth": ["user", "pw"],
+        "proxy": None,
+        "verify": True,
+        "unix_socket": None,
+        "http2": False,
+        "output": None,
+        "create_dirs": False,
+        "compressed": False,
+        "cookie_file": None,
+        "cookie_jar": None,
+        "source": {"path": "history", "line": 3},
+    }
+
+
+def test_context_to_dict_keeps_json_body_as_data():
+    parsed_context = uncurlx.parse_context(f"""curl '{ENDPOINT}' --json '{{"a": [1, true, null]}}'""")
+    assert context_to_dict(parsed_context)["json"] == {"a": [1, True, None]}
+
+
+def test_context_from_dict_rejects_other_versions():
+    data = context_to_dict(uncurlx.parse_context(f"curl '{ENDPOINT}'"))
+    data["version"] = SCHEMA_VERSION + 1
+    with pytest.raises(ValueError):
+        context_from_dict(data)
+
+
+def test_context_from_dict_reads_version_1():
+    line = {
+        "version": 1,
+        "method": "GET",
+        "url": ENDPOINT,
+        "headers": [["Accept", "*/*"]],
+        "cookies": {},
+        "content_base64": None,
+        "json": None,
+        "form": [],
+        "auth": None,
+        "proxy": {"http": "http://user:pw@proxy:3128", "https": "http://user:pw@proxy:3128"},
+        "verify": True,
+        "unix_socket": None,
+        "http2": False,
+    }
+    parsed_context = context_from_dict(json.loads(json.dumps(line)))
+    assert parsed_context == uncurlx.parse_context(f"curl '{ENDPOINT}' -H 'Accept: */*' -x user:pw@proxy:3128")
+    assert context_from_dict(context_to_dict(parsed_context)) == parsed_context
+    assert context_to_dict(parsed_context)["proxy"] == {
+        "scheme": "http",
+        "host": "proxy",
+        "port": 3128,
+        "username": "user",
+        "password": "pw",
+        "no_proxy": [],
+    }
+
+
+def test_jsonl_stream_round_trip():
+    commands = [f"curl '{ENDPOINT}/{index}' -H 'X-Index: {index}'" for index in range(3)]
+    stream = io.StringIO()
+    assert parse_jsonl(commands, stream) == 3
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 3
+    assert [json.loads(line)["url"] for line in lines] == [f"{ENDPOINT}/{index}" for index in range(3)]
+
+    stream.seek(0)
+    contexts = list(iter_jsonl(stream))
+    assert contexts == [uncurlx.parse_context(command) for command in commands]
+
+    copy = io.StringIO()
+    dump_jsonl((context_to_dict(context) for context in contexts), copy)
+    assert copy.getvalue() == stream.getvalue()
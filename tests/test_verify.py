@@ -0,0 +1,109 @@
+import io
+
+import pytest
+
+from tests.constants import LOCAL_ENDPOINT, TESTS, ParametrizedConversion
+from uncurlx import verify
+from uncurlx.api import parse_context
+from uncurlx.verify import report, verify_context, verify_contexts
+
+
+@pytest.mark.parametrize("test", TESTS)
+def test_generated_code_is_equivalent(test: ParametrizedConversion, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    curl_cmd = test.with_endpoint(LOCAL_ENDPOINT).curl_cmd
+    result = verify_context(parse_context(curl_cmd[0] if isinstance(curl_cmd, tuple) else curl_cmd), test.name)
+    assert result.error is None
+    assert result.differences == {}
+    # -o, --create-dirs and -c are not written to disk
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_differences_are_reported(monkeypatch):
+    parsed_context = parse_context(f"curl '{LOCAL_ENDPOINT}' -H 'X-Test: 1' -b 'a=1' -d 'payload'")
+    monkeypatch.setattr(verify, "unparse_context", lambda _: f"httpx.post({LOCAL_ENDPOINT!r}, cookies={{'a': '2'}})")
+    result = verify_context(parsed_context, "capture.jsonl:1")
+    assert result.error is None
+    assert sorted(result.differences) == ["body", "cookies", "headers"]
+    assert result.differences["cookies"] == ({"a": "2"}, {"a": "1"})
+    assert result.differences["body"] == (b"", b"payload")
+
+
+@pytest.mark.parametrize(
+    "code, expected",
+    [
+        # a proxy mount alone loses to the proxy environment variables
+        (
+            "client = httpx.Client(mounts={'all://': httpx.HTTPTransport(proxy='http://proxy:3128')})\n"
+            f"client.get({LOCAL_ENDPOINT!r})",
+            {"proxy": "http://proxy:3128", "trust_env": True},
+        ),
+        (f"httpx.get({LOCAL_ENDPOINT!r})", {"proxy": None, "trust_env": True}),
+        (f"httpx.Client(verify=False, http2=True).get({LOCAL_ENDPOINT!r})", {"proxy": None, "verify": False}),
+    ],
+)
+def test_transport_differences_are_reported(code, expected, monkeypatch):
+    parsed_context = parse_context(f"curl '{LOCAL_ENDPOINT}' -x proxy:3128 -k --http2")
+    monkeypatch.setattr(verify, "unparse_string", lambda _: code)
+    result = verify_context(parsed_context)
+    assert result.backend == "string"
+    assert list(result.differences) == ["transport"]
+    generated, reference = result.differences["transport"]
+    assert reference == verify.TransportOptions("http://proxy:3128", False, True, None, False)
+    assert {field: getattr(generated, field) for field in expected} == expected
+
+
+@pytest.mark.parametrize(
+    "code, expected",
+    [
+        ("httpx.get(", "generated code failed: SyntaxError"),
+        ("raise RuntimeError('boom')", "generated code failed: RuntimeError('boom')"),
+    ],
+)
+def test_failures_are_reported(code, expected, monkeypatch):
+    monkeypatch.setattr(verify, "unparse_context", lambda _: code)
+    result = verify_context(parse_context(f"curl '{LOCAL_ENDPOINT}'"), "script.sh:3")
+    assert result.error.startswith(expected)
+
+
+def test_missing_request_is_reported(monkeypatch):
+    monkeypatch.setattr(verify, "unparse_context", lambda _: "None")
+    assert verify_context(parse_context(f"curl '{LOCAL_ENDPOINT}'")).differences == {"requests": (0, 1)}
+
+
+def test_verify_contexts_in_parallel():
+    requests = [(f"script.sh:{line}", parse_context(f"curl '{LOCAL_ENDPOINT}?line={line}'")) for line in range(7)]
+    results = list(verify_contexts(requests, processes=2, batch_size=3))
+    assert [result.source for result in results] == [source for source, _ in requests]
+    assert all(result.error is None and not result.differences for result in results)
+
+
+def test_verify_contexts_reads_requests_as_workers_free_up():
+    read = []
+
+    def requests():
+        for line in range(20):
+            read.append(line)
+            yield f"script.sh:{line}", parse_context(f"curl '{LOCAL_ENDPOINT}?line={line}'")
+
+    results = verify_contexts(requests(), processes=2, batch_size=1)
+    assert next(results).source == "script.sh:0"
+    assert len(read) == 2 * verify.BATCHES_IN_FLIGHT
+    assert [result.source for result in results] == [f"script.sh:{line}" for line in range(1, 20)]
+
+
+def test_report(monkeypatch):
+    monkeypatch.setattr(
+        verify, "unparse_context", lambda _: f"httpx.get({LOCAL_ENDPOINT!r}, headers={{'X-Test': '2'}})"
+    )
+    requests = [
+        ("a.sh:1", parse_context(f"curl '{LOCAL_ENDPOINT}' -H 'X-Test: 2'")),
+        ("a.sh:2", parse_context(f"curl '{LOCAL_ENDPOINT}' -H 'X-Test: 1'")),
+    ]
+    output = io.StringIO()
+    counts = report(verify_contexts(requests, processes=1), output)
+    lines = output.getvalue().splitlines()
+    assert lines[0].startswith("# a.sh:2 (ast backend): headers differ: got [")
+    assert lines[1].startswith("# verified 2 requests in ")
+    assert lines[1].endswith("s: 1 equivalent, 1 different (headers: 1), 0 failed")
+    assert (counts["equivalent"], counts["different"], counts["failed"]) == (1, 1, 0)
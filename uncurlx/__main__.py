@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
+import argparse
 import sys
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 try:
     from pyperclip import paste as clip_paste
@@ -10,20 +11,223 @@ except ImportError:
         return list()
 
 
+from .api import ParsedContext, parse_context
 from .ast_api import parse
+from .download import DEFAULT_CHUNKS, parse_download
+from .emitters import DEFAULT_TARGET, EMITTERS, emit
+from .package import GROUP_BY, write_package
+from .scan import ScanResult, scan_paths
+from .serialize import context_to_json, iter_jsonl
+from .verify import DEFAULT_BATCH_SIZE, report, verify_contexts
+
+cli_parser = argparse.ArgumentParser(
+    prog="uncurlx",
+    usage="uncurlx [options] [curl command]",
+    description="Convert a curl command (from the arguments, stdin or the clipboard) into python httpx code.",
+    allow_abbrev=False,
+)
+cli_parser.add_argument(
+    "--format",
+    choices=["python", "jsonl"],
+    default="python",
+    help="print python code, or the parsed request as a line of versioned JSON",
+)
+cli_parser.add_argument(
+    "--target",
+    choices=sorted(EMITTERS),
+    default=None,
+    help="generate a module with a pooled client for this library instead of a single httpx call",
+)
+cli_parser.add_argument(
+    "--timing",
+    action="store_true",
+    help="instrument the generated httpx client to log per-phase timings and sizes (implies --target httpx)",
+)
+cli_parser.add_argument(
+    "--cache",
+    action="store_true",
+    help="serve repeated GET requests of the generated httpx client from an HTTP cache (implies --target httpx)",
+)
+cli_parser.add_argument(
+    "--cache-dir",
+    default=None,
+    help="keep the HTTP cache of the generated httpx client in this directory, across runs (implies --cache)",
+)
+cli_parser.add_argument(
+    "--download",
+    action="store_true",
+    help="generate a script that downloads the target in parallel ranged chunks, with resume support",
+)
+cli_parser.add_argument("--chunks", type=int, default=DEFAULT_CHUNKS, help="number of chunks for --download")
+cli_parser.add_argument("--output", default=None, help="output file for --download")
+
+scan_parser = argparse.ArgumentParser(
+    prog="uncurlx scan",
+    description="Find curl commands in scripts, history files and logs, and convert each of them.",
+)
+scan_parser.add_argument("paths", nargs="+", help="files or directories to scan")
+scan_parser.add_argument("--processes", type=int, default=None, help="worker processes, defaults to the CPU count")
+scan_parser.add_argument(
+    "--format",
+    choices=["python", "jsonl"],
+    default="python",
+    help="print python code, or one line of versioned JSON per command with its source file and line",
+)
+
+package_parser = argparse.ArgumentParser(
+    prog="uncurlx package",
+    description="Convert every curl command found in files (or JSONL captures) into a lazily imported package.",
+)
+package_parser.add_argument("directory", help="the package directory to write")
+package_parser.add_argument("paths", nargs="+", help="files or directories to scan, .jsonl files are read as captures")
+package_parser.add_argument(
+    "--group-by",
+    choices=GROUP_BY,
+    default="host",
+    help="put requests in one submodule per host, or per host and first path segment",
+)
+package_parser.add_argument("--processes", type=int, default=None, help="worker processes, defaults to the CPU count")
+
+verify_parser = argparse.ArgumentParser(
+    prog="uncurlx verify",
+    description="Check that the code generated for every curl command found in files (or JSONL captures) sends the "
+    "same method, url, headers, cookies and body as the command itself, through the same proxy and with the same TLS, "
+    "HTTP/2 and unix socket options. The reference request is built from the same "
+    "parsed command as the generated code, so this catches code generation errors, not parsing errors.",
+)
+verify_parser.add_argument("paths", nargs="+", help="files or directories to scan, .jsonl files are read as captures")
+verify_parser.add_argument("--processes", type=int, default=None, help="worker processes, defaults to the CPU count")
+verify_parser.add_argument(
+    "--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="requests verified by a worker at a time"
+)
+
+
+def split_cli_args(argv: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split the uncurlx options from the curl command that follows them.
+    """
+    for index, token in enumerate(argv):
+        if token == "curl" or token.startswith("curl "):
+            return argv[:index], argv[index:]
+    if argv and not argv[0].startswith("-"):
+        return [], argv
+    return argv, []
+
+
+def codegen_options(options: argparse.Namespace) -> Dict[str, Any]:
+    """
+    The emitter options set on the command line.
+    """
+    codegen: Dict[str, Any] = {}
+    if options.timing:
+        codegen["instrument"] = True
+    if options.cache or options.cache_dir:
+        codegen["cache"] = True
+    if options.cache_dir:
+        codegen["cache_dir"] = options.cache_dir
+    return codegen
+
+
+def download_conflicts(options: argparse.Namespace) -> List[str]:
+    """
+    The options set on the command line that --download would ignore.
+    """
+    conflicts = {
+        "--format jsonl": options.format == "jsonl",
+        "--target": options.target,
+        "--timing": options.timing,
+        "--cache": options.cache,
+        "--cache-dir": options.cache_dir,
+    }
+    return [name for name, value in conflicts.items() if value] if options.download else []
+
+
+def convert(curl_command: Union[str, List[str]], options: argparse.Namespace) -> str:
+    if options.format == "jsonl":
+        return context_to_json(parse_context(curl_command))
+    if options.download:
+        return parse_download(curl_command, output=options.output, chunks=options.chunks)
+    codegen = codegen_options(options)
+    if options.target or codegen:
+        return emit(curl_command, options.target or DEFAULT_TARGET, **codegen)
+    return parse(curl_command)
+
+
+def print_skipped(result: ScanResult) -> None:
+    """
+    Report a command that could not be parsed, or a file that could not be read, on stderr.
+    """
+    location = result.path if result.line is None else f"{result.path}:{result.line}"
+    print(f"# {location}: skipped: {result.error}", file=sys.stderr)
+
+
+def scan_main(argv: List[str]) -> int:
+    options = scan_parser.parse_args(argv)
+    jsonl = options.format == "jsonl"
+    results = scan_paths(options.paths, processes=options.processes, generate_code=not jsonl)
+    for result in results:
+        if result.error:
+            print_skipped(result)
+        elif jsonl:
+            print(context_to_json(result.context, source={"path": result.path, "line": result.line}))
+        else:
+            print(f"# {result.path}:{result.line}\n{result.code}\n")
+    return 0
+
+
+def iter_captured_requests(paths: List[str], processes: Optional[int] = None) -> Iterator[Tuple[str, ParsedContext]]:
+    """
+    Yield the requests of JSONL captures, and of the curl commands found in every other file, with their source.
+    """
+    jsonl_paths = [path for path in paths if path.endswith(".jsonl")]
+    for path in jsonl_paths:
+        with open(path, encoding="utf-8") as capture:
+            for index, parsed_context in enumerate(iter_jsonl(capture), 1):
+                yield f"{path}:{index}", parsed_context
+    other_paths = [path for path in paths if not path.endswith(".jsonl")]
+    for result in scan_paths(other_paths, processes=processes, generate_code=False):
+        if result.error:
+            print_skipped(result)
+        else:
+            yield f"{result.path}:{result.line}", result.context
+
+
+def package_main(argv: List[str]) -> int:
+    options = package_parser.parse_args(argv)
+    parsed_contexts = (parsed_context for _, parsed_context in iter_captured_requests(options.paths, options.processes))
+    paths = write_package(parsed_contexts, options.directory, options.group_by)
+    print(f"# wrote {len(paths) - 1} modules to {options.directory}")
+    return 0
+
+
+def verify_main(argv: List[str]) -> int:
+    options = verify_parser.parse_args(argv)
+    requests = iter_captured_requests(options.paths, options.processes)
+    counts = report(verify_contexts(requests, options.processes, options.batch_size), sys.stdout)
+    return 1 if counts["different"] or counts["failed"] else 0
+
+
+SUBCOMMANDS = {"scan": scan_main, "package": package_main, "verify": verify_main}
 
 
 def main() -> int:
+    if sys.argv[1:2] and sys.argv[1] in SUBCOMMANDS:
+        return SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+    cli_args, curl_args = split_cli_args(sys.argv[1:])
+    options = cli_parser.parse_args(cli_args)
+    conflicts = download_conflicts(options)
+    if conflicts:
+        cli_parser.error(f"{', '.join(conflicts)} cannot be combined with --download")
     if sys.stdin.isatty():
-        if len(sys.argv) > 1:
+        if curl_args:
             # If an argument is passed
-            result = parse(sys.argv[1:])
+            result = convert(curl_args, options)
         else:
             # Otherwise pull from clipboard
-            result = parse(clip_paste())
+            result = convert(clip_paste(), options)
     else:
-        result = parse(sys.stdin.read())
-    print("\n" + result)
+        result = convert(sys.stdin.read(), options)
+    print(result if options.format == "jsonl" else "\n" + result)
     return 0
 
 
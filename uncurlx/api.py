@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 import argparse
 import json
+import os
 import re
 import shlex
 from collections import Counter, OrderedDict, namedtuple
 from http.cookies import SimpleCookie
-from typing import Any, List, Mapping, Optional, Tuple, Union
-from urllib.parse import quote_plus
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Tuple, Union
+from urllib.parse import quote, quote_plus, unquote, urlsplit, urlunsplit
 
 parser = argparse.ArgumentParser()
 parser.add_argument("command")
@@ -21,14 +22,25 @@ parser.add_argument("-k", "--insecure", action="store_true")
 parser.add_argument("--user", "-u", default=())
 parser.add_argument("-i", "--include", action="store_true")
 parser.add_argument("-s", "--silent", action="store_true")
-parser.add_argument("-x", "--proxy", default={})
+parser.add_argument("-x", "--proxy", default=None)
 parser.add_argument("-U", "--proxy-user", default="")
+parser.add_argument("--noproxy", default="")
+parser.add_argument("--socks5", default=None)
+parser.add_argument("--socks5-hostname", default=None)
 parser.add_argument("-F", "--form", action="append", default=[])
+parser.add_argument("--form-string", action="append", default=[])
 parser.add_argument("-e", "--referer", default="")
 parser.add_argument("-r", "--range", default="")
 parser.add_argument("--unix-socket", default="")
 parser.add_argument("--json", default="")
 parser.add_argument("--url", dest="explicit_url", default=None)
+parser.add_argument("--http2", "--http2-prior-knowledge", action="store_true")
+parser.add_argument("-o", "--output", default=None)
+parser.add_argument("-O", "--remote-name", action="store_true")
+parser.add_argument("--output-dir", default=None)
+parser.add_argument("--create-dirs", action="store_true")
+parser.add_argument("-b", "--cookie", action="append", default=[])
+parser.add_argument("-c", "--cookie-jar", default=None)
 # parser.add_argument("--basic", action="store_true", nargs=0)
 
 
@@ -49,9 +61,31 @@ ParsedContext = namedtuple(
         "proxy",
         "unix_socket",
         "json",
+        "http2",
+        "output",
+        "create_dirs",
+        "compressed",
+        "cookie_file",
+        "cookie_jar",
     ],
+    # the fields added for -o/--output, --create-dirs, --compressed, -b FILE and -c/--cookie-jar default to unset, so
+    # contexts built without them still work: the response is then read into memory and no cookie file is used
+    defaults=(None, False, False, None, None),
 )
 
+FormField = namedtuple("FormField", ["name", "value", "path", "filename", "content_type"])
+
+# a `password` of None means none was given (`user@host`), while "" is an empty one (`user:@host`)
+Proxy = namedtuple("Proxy", ["scheme", "host", "port", "username", "password", "no_proxy"])
+
+# httpx (with the `socks` extra for socks5/socks5h) cannot use socks4 proxies
+PROXY_SCHEMES = ("http", "https", "socks5", "socks5h")
+DEFAULT_PROXY_PORTS = {"https": 443}
+DEFAULT_PROXY_PORT = 1080
+
+# `;type=`, `;filename=`... modifiers at the end of a -F value
+FORM_MODIFIER_PATTERN = re.compile(r";\s*(?=(?:type|filename|headers|encoder)=)")
+
 
 def normalize_newlines(multiline_text: str) -> str:
     return multiline_text.replace(" \\\n", " ")
@@ -64,6 +98,75 @@ def more_than_one_of(*args: Any) -> bool:
     return sum(bool(arg) for arg in args) > 1
 
 
+def parse_form_field(form: str, literal: bool = False) -> FormField:
+    """
+    Parse a -F/--form value into a FormField.
+    `name=value` is a plain field, `name=@path` uploads a file and `name=<path` sends the file contents as a plain field.
+    `;type=` and `;filename=` modifiers set the content type and file name of the part.
+    :param form: The value of the -F option.
+    :param literal: Treat the value as a --form-string, without `@`, `<` or modifiers.
+    :return: A FormField describing the part.
+    """
+    name, separator, value = form.partition("=")
+    if not separator:
+        raise ValueError("Invalid -F/--form value, expected name=content.", form)
+    if literal:
+        return FormField(name=name, value=value, path=None, filename=None, content_type=None)
+
+    if value.startswith('"') and value.count('"') > 1:
+        # a quoted value may contain semicolons
+        closing_quote = value.index('"', 1)
+        content = value[1:closing_quote]
+        modifiers = FORM_MODIFIER_PATTERN.split(value[closing_quote + 1 :])[1:]
+    else:
+        content, *modifiers = FORM_MODIFIER_PATTERN.split(value)
+    options = dict(modifier.strip().split("=", 1) for modifier in modifiers)
+
+    if content.startswith("@"):
+        path = content[1:]
+        filename = options.get("filename", os.path.basename(path))
+        return FormField(name=name, value=None, path=path, filename=filename, content_type=options.get("type"))
+    if content.startswith("<"):
+        return FormField(name=name, value=None, path=content[1:], filename=None, content_type=options.get("type"))
+    return FormField(name=name, value=content, path=None, filename=None, content_type=options.get("type"))
+
+
+def split_pseudo_headers(headers: List[str]) -> Tuple[List[str], Mapping[str, str]]:
+    """
+    Separate HTTP/2 pseudo-headers (`:authority`, `:path`, ...) from the regular headers.
+    Chrome's "Copy as cURL" includes them for HTTP/2 requests, but they are not real headers.
+    :param headers: List of headers from the curl command.
+    :return: A tuple containing the regular headers and a dictionary of pseudo-headers.
+    """
+    regular_headers: List[str] = list()
+    pseudo_headers = OrderedDict()
+    for curl_header in headers:
+        if curl_header.startswith(":"):
+            header_key, _, header_value = curl_header[1:].partition(":")
+            pseudo_headers[":" + header_key.strip().lower()] = header_value.strip()
+        else:
+            regular_headers.append(curl_header)
+    return regular_headers, pseudo_headers
+
+
+def apply_pseudo_headers(url: Optional[str], pseudo_headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Fill in the parts of the url that were only recorded as `:scheme`, `:authority` and `:path` pseudo-headers.
+    Parts already present in the url take precedence.
+    """
+    if not pseudo_headers:
+        return url
+    scheme, netloc, path, query, fragment = urlsplit(url or "")
+    if not netloc and "://" not in (url or ""):
+        # scheme-less urls such as "example.com/path" or "/path"
+        scheme, netloc, path, query, fragment = urlsplit("//" + (url or ""))
+    if not path and not query and ":path" in pseudo_headers:
+        path, _, query = pseudo_headers[":path"].partition("?")
+    netloc = netloc or pseudo_headers.get(":authority", "")
+    scheme = scheme or pseudo_headers.get(":scheme", "https")
+    return urlunsplit((scheme, netloc, path, query, fragment))
+
+
 def parse_headers(
     headers: List[str],
     data_content_type: Optional[str],
@@ -80,19 +183,13 @@ def parse_headers(
     cookie_dict = OrderedDict()
 
     for curl_header in headers:
-        if curl_header.startswith(":"):
-            occurrence = [m.start() for m in re.finditer(":", curl_header)]
-            header_key, header_value = (
-                curl_header[: occurrence[1]],
-                curl_header[occurrence[1] + 1 :],
-            )
-        else:
-            header_key, header_value = curl_header.split(":", 1)
+        header_key, header_value = curl_header.split(":", 1)
 
         if header_key.lower().strip("$") == "cookie":
             cookie = SimpleCookie(bytes(header_value, "ascii").decode("unicode-escape"))
 
-            cookie_dict = dict(sorted([(key, value.value) for key, value in cookie.items()]))
+            # repeated Cookie headers (or -b options) add up, like curl sends them all
+            cookie_dict.update((key, value.value) for key, value in cookie.items())
         else:
             quoted_headers.append((header_key, header_value.strip()))
             if header_key.lower() == "content-type":
@@ -105,10 +202,17 @@ def parse_headers(
     if referer:
         quoted_headers.append(("Referer", referer))
     quoted_headers = sorted(quoted_headers, key=lambda x: x[0].lower())
-    repeat_headers_counter = Counter([x[0].lower() for x in quoted_headers])
+    return collapse_headers(quoted_headers), dict(sorted(cookie_dict.items()))
+
+
+def collapse_headers(header_items: List[Tuple[str, str]]) -> Union[List[Tuple[str, str]], Mapping[str, str]]:
+    """
+    Return the headers as an OrderedDict, unless a header name is repeated, in which case they stay a list of tuples.
+    """
+    repeat_headers_counter = Counter([x[0].lower() for x in header_items])
     if repeat_headers_counter and repeat_headers_counter.most_common(1)[0][1] <= 1:
-        quoted_headers = OrderedDict(quoted_headers)
-    return quoted_headers, cookie_dict
+        return OrderedDict(header_items)
+    return header_items
 
 
 def parse_context(curl_command: Union[str, List[str]]) -> ParsedContext:
@@ -126,16 +230,18 @@ def parse_context(curl_command: Union[str, List[str]]) -> ParsedContext:
     if more_than_one_of(
         parsed_args.data or parsed_args.data_urlencode,
         parsed_args.data_binary,
-        parsed_args.form,
+        parsed_args.form or parsed_args.form_string,
         parsed_args.json,
     ):
-        raise ValueError("You can only use one kind of -d/--data, -b/--data-binary, or -F/--form options at a time.")
+        raise ValueError("You can only use one kind of -d/--data, --data-binary, or -F/--form options at a time.")
     raw_data = parsed_args.data_binary or "&".join([*map(quote_plus, parsed_args.data), *parsed_args.data_urlencode])
-    form_data = parsed_args.form
+    form_data = [
+        *(parse_form_field(form) for form in parsed_args.form),
+        *(parse_form_field(form, literal=True) for form in parsed_args.form_string),
+    ]
     json_data = None
-    data_content_type = (
-        "multipart/form-data" if parsed_args.form else "application/x-www-form-urlencoded" if raw_data else None
-    )
+    # the multipart content type is left to httpx, since it has to include the boundary
+    data_content_type = "application/x-www-form-urlencoded" if raw_data else None
 
     try:
         json_data = repr(json.loads(parsed_args.json)) if parsed_args.json else None
@@ -145,14 +251,23 @@ def parse_context(curl_command: Union[str, List[str]]) -> ParsedContext:
             parsed_args.json,
         ) from jde
 
-    if raw_data or json_data:
+    if raw_data or json_data or form_data:
         method = "post"
 
     if parsed_args.request:
         method = parsed_args.request.lower()
 
+    output = parse_output(parsed_args)
+    headers, pseudo_headers = split_pseudo_headers(parsed_args.header)
+    # -b takes either cookies ("name=value; other=value") or the path of a Netscape cookie file
+    inline_cookies = [cookie for cookie in parsed_args.cookie if "=" in cookie]
+    cookie_files = [cookie for cookie in parsed_args.cookie if "=" not in cookie]
+    headers.extend(f"Cookie: {cookie}" for cookie in inline_cookies)
+    if output and not parsed_args.compressed and not any(h.lower().startswith("accept-encoding:") for h in headers):
+        # curl only asks for a compressed response with --compressed, while httpx always does by default
+        headers.append("Accept-Encoding: identity")
     quoted_headers, cookie_dict = parse_headers(
-        parsed_args.header,
+        headers,
         data_content_type,
         referer=parsed_args.referer,
         range=parsed_args.range,
@@ -164,11 +279,15 @@ def parse_context(curl_command: Union[str, List[str]]) -> ParsedContext:
         user = tuple(user.split(":"))
 
     # add proxy and its authentication if it's available.
-    proxies = parse_proxy(parsed_args.proxy, parsed_args.proxy_user)
+    proxies = parse_proxy(
+        parsed_args.proxy or socks_proxy(parsed_args.socks5, parsed_args.socks5_hostname),
+        parsed_args.proxy_user,
+        parsed_args.noproxy,
+    )
 
     return ParsedContext(
         method=method,
-        url=parsed_args.url or parsed_args.explicit_url,
+        url=apply_pseudo_headers(parsed_args.url or parsed_args.explicit_url, pseudo_headers),
         content=raw_data,
         params=[],
         form_data=form_data,
@@ -179,53 +298,157 @@ def parse_context(curl_command: Union[str, List[str]]) -> ParsedContext:
         proxy=proxies,
         unix_socket=parsed_args.unix_socket,
         json=json_data if parsed_args.json else None,
+        http2=parsed_args.http2 or bool(pseudo_headers),
+        output=output,
+        create_dirs=parsed_args.create_dirs,
+        compressed=parsed_args.compressed,
+        # curl reads every -b file, but a single jar is loaded here, so only the last file given is used
+        cookie_file=cookie_files[-1] if cookie_files else None,
+        cookie_jar=parsed_args.cookie_jar,
     )
 
 
-def parse_proxy(proxy: Optional[str], proxy_user: Optional[str]) -> Mapping[str, str]:
-    # add proxy and its authentication if it's available.
-    proxies = proxy
-    # proxy_auth = proxy_user
-    if proxy and proxy_user:
-        proxies = {
-            "http": "http://{}@{}/".format(proxy_user, proxy),
-            "https": "http://{}@{}/".format(proxy_user, proxy),
-        }
-    elif proxy:
-        proxies = {
-            "http": "http://{}/".format(proxy),
-            "https": "http://{}/".format(proxy),
-        }
-    return proxies
+def parse_output(parsed_args: argparse.Namespace) -> Optional[str]:
+    """
+    Resolve the file curl would write the response to from -o/--output, -O/--remote-name and --output-dir.
+    :return: The output path, or None when the response goes to stdout.
+    """
+    output = parsed_args.output
+    if parsed_args.remote_name and not output:
+        url = parsed_args.url or parsed_args.explicit_url or ""
+        output = urlsplit(url).path.rpartition("/")[2]
+        if not output:
+            raise ValueError("-O/--remote-name needs a URL ending with a file name.", url)
+    if not output or output == "-":
+        return None
+    if parsed_args.output_dir:
+        return os.path.join(parsed_args.output_dir, output)
+    return output
+
+
+def socks_proxy(socks5: Optional[str], socks5_hostname: Optional[str]) -> Optional[str]:
+    """
+    Turn --socks5 / --socks5-hostname into the equivalent -x proxy URL.
+    """
+    if socks5_hostname:
+        return f"socks5h://{socks5_hostname}"
+    if socks5:
+        return f"socks5://{socks5}"
+    return None
+
+
+def parse_proxy(proxy: Optional[str], proxy_user: Optional[str], no_proxy: Optional[str] = None) -> Optional[Proxy]:
+    """
+    Parse a curl proxy, `[scheme://][user:password@]host[:port]`, with curl's defaults of http and port 1080.
+    :param proxy: The -x/--proxy value. An empty value disables the proxy, like it does for curl.
+    :param proxy_user: The -U/--proxy-user `user:password`, which takes precedence over credentials in the proxy URL.
+    :param no_proxy: The --noproxy comma-separated hosts (and their subdomains) to connect to directly, or `*`.
+    :return: A Proxy, or None without a proxy.
+    """
+    if not proxy:
+        return None
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    scheme = parts.scheme.lower()
+    if scheme not in PROXY_SCHEMES:
+        raise ValueError(f"Unsupported proxy scheme {scheme!r}, expected one of: {', '.join(PROXY_SCHEMES)}.", proxy)
+    username = unquote(parts.username) if parts.username is not None else None
+    password = unquote(parts.password) if parts.password is not None else None
+    if proxy_user:
+        username, separator, password = proxy_user.partition(":")
+        password = password if separator else None
+    hosts = (host.strip().lower().lstrip(".") for host in (no_proxy or "").split(","))
+    return Proxy(
+        scheme=scheme,
+        host=parts.hostname,
+        port=parts.port or DEFAULT_PROXY_PORTS.get(scheme, DEFAULT_PROXY_PORT),
+        username=username,
+        password=password,
+        no_proxy=tuple(host for host in hosts if host),
+    )
+
+
+def proxy_url(proxy: Proxy) -> str:
+    """
+    The URL of a proxy, including its credentials, in the form httpx and the other client libraries take.
+    """
+    credentials = ""
+    if proxy.username is not None:
+        credentials = quote(proxy.username, safe="")
+        if proxy.password is not None:
+            credentials += ":" + quote(proxy.password, safe="")
+        credentials += "@"
+    host = f"[{proxy.host}]" if ":" in proxy.host else proxy.host
+    return f"{proxy.scheme}://{credentials}{host}:{proxy.port}"
+
+
+def proxy_mounts(proxy: Optional[Proxy]) -> List[Tuple[str, Optional[str]]]:
+    """
+    The httpx mount patterns for a proxy: all traffic goes through the proxy URL, except --noproxy hosts which map
+    to None, i.e. a direct connection. `--noproxy '*'` bypasses the proxy altogether, so nothing is mounted.
+    """
+    if not proxy or "*" in proxy.no_proxy:
+        return []
+    return [("all://", proxy_url(proxy)), *((pattern, None) for pattern in no_proxy_patterns(proxy.no_proxy))]
+
+
+def no_proxy_patterns(no_proxy: Iterable[str]) -> List[str]:
+    """
+    httpx mount patterns matching --noproxy hosts.
+    `*example.com` matches the domain and its subdomains, like curl does, but is not valid for IP addresses.
+    """
+    patterns = []
+    for host in no_proxy:
+        if ":" in host:
+            patterns.append(f"all://[{host.strip('[]')}]")
+        elif host.replace(".", "").isdigit():
+            patterns.append(f"all://{host}")
+        else:
+            patterns.append(f"all://*{host}")
+    return patterns
+
+
+def bypasses_proxy(url: str, proxy: Optional[Proxy]) -> bool:
+    """
+    Whether curl would connect to `url` directly because of --noproxy.
+    """
+    if not proxy:
+        return True
+    host = (urlsplit(url).hostname or "").lower()
+    return any(pattern == "*" or host == pattern or host.endswith("." + pattern) for pattern in proxy.no_proxy)
 
 
 def parse(curl_command: Union[str, List[str]], **kargs) -> str:
-    parsed_context = parse_context(curl_command)
-    client = "httpx"
-    client_setup = ""
-    if parsed_context.unix_socket:
-        client = "client"
-        client_setup = f'{client} = httpx.Client(transport=httpx.HTTPTransport(uds="{parsed_context.unix_socket}"))\n'
+    return unparse_context(parse_context(curl_command), **kargs)
+
+
+def unparse_context(parsed_context: ParsedContext, **kargs) -> str:
+    """
+    Generate the httpx code for an already parsed curl command.
+    """
+    client_setup = client_setup_code(parsed_context)
+    client = "client" if client_setup else "httpx"
     data_token = ""
     if parsed_context.content:
         data_token = "{}content='{}',\n".format(BASE_INDENT, parsed_context.content)
     if parsed_context.form_data:
-        data_token = "{}data='{}',\n".format(BASE_INDENT, parsed_context.form_data)
+        data_token = "{}files={},\n".format(BASE_INDENT, form_files_to_string(parsed_context.form_data))
     if parsed_context.json:
         data_token = "{}json={},\n".format(BASE_INDENT, parsed_context.json)
     if parsed_context.params:
         data_token = "{}params={},\n".format(BASE_INDENT, parsed_context.params)
 
-    verify_token = "{}verify=False,\n".format(BASE_INDENT) if not parsed_context.verify else ""
+    # a client takes verify=False itself, only the top-level httpx functions accept it per request
+    verify_token = "{}verify=False,\n".format(BASE_INDENT) if not (parsed_context.verify or client_setup) else ""
 
     requests_kargs = "".join("{}{}={},\n".format(BASE_INDENT, k, str(v)) for k, v in sorted(kargs.items()))
 
     indent_count = 1
     indent = indent_count * BASE_INDENT
     auth_data = "{}auth={},\n".format(indent, parsed_context.auth) if parsed_context.auth else ""
-    proxy_data = "{}proxy={},\n".format(indent, parsed_context.proxy) if parsed_context.proxy else ""
     formatter = {
-        "client_setup": client_setup,
+        "imports": "".join(f"import {module}\n" for module in required_imports(parsed_context)),
+        "client_setup": cookie_jar_load_code(parsed_context) + client_setup,
+        "cookie_jar_save": cookie_jar_save_code(parsed_context),
         "client": client,
         "method": parsed_context.method,
         "url": parsed_context.url,
@@ -239,13 +462,169 @@ def parse(curl_command: Union[str, List[str]], **kargs) -> str:
         "security_token": verify_token,
         "requests_kargs": requests_kargs,
         "auth": auth_data,
-        "proxies": proxy_data,
     }
 
+    if parsed_context.output:
+        return stream_to_file(parsed_context, formatter)
+    return """
+{imports}{client_setup}{client}.{method}("{url}",
+{requests_kargs}{data_token}{headers_token}{cookies_token}{auth}{security_token})
+{cookie_jar_save}""".format(**formatter).strip()
+
+
+def required_imports(parsed_context: ParsedContext) -> List[str]:
+    """
+    Modules the generated code needs besides httpx.
+    """
+    imports = set()
+    if parsed_context.cookie_file or parsed_context.cookie_jar:
+        imports.add("http.cookiejar")
+    if parsed_context.cookie_file or (parsed_context.create_dirs and os.path.dirname(parsed_context.output or "")):
+        imports.add("os")
+    return sorted(imports)
+
+
+def httpx_client_arguments(
+    unix_socket: Optional[str] = None,
+    http2: bool = False,
+    verify: bool = True,
+    cookies: Optional[str] = None,
+    proxy: Optional[str] = None,
+    no_proxy: Iterable[str] = (),
+    trust_env: bool = True,
+    prefix: str = "",
+    wrap_transport: Optional[Callable[[str], str]] = None,
+) -> List[str]:
+    """
+    The arguments of a generated `httpx.Client`, shared by the string, ast and emitter backends.
+    :param unix_socket: The python expression of the --unix-socket path, if any.
+    :param cookies: The python expression of the client cookies, e.g. a cookie jar.
+    :param proxy: The python expression of the proxy URL, when the request goes through a proxy.
+    :param no_proxy: The httpx mount patterns of the hosts reached directly despite the proxy.
+    :param trust_env: False when the command sets its own proxy, as HTTP_PROXY and friends would otherwise take
+        precedence over the "all://" mount, and --noproxy hosts would still go through them.
+    :param prefix: "Async" for a `httpx.AsyncClient`.
+    :param wrap_transport: Wraps the source of every transport, e.g. in a caching transport, so that the client always
+        gets an explicit transport.
+    """
+    # a client given a transport ignores its own verify and http2 options, so they go on the transports
+    transport_options = [*(["verify=False"] if not verify else []), *(["http2=True"] if http2 else [])]
+
+    def transport(*options: str) -> str:
+        source = f"httpx.{prefix}HTTPTransport({', '.join([*options, *transport_options])})"
+        return wrap_transport(source) if wrap_transport else source
+
+    arguments = []
+    if unix_socket or wrap_transport:
+        arguments.append(f"transport={transport(*([f'uds={unix_socket}'] if unix_socket else []))}")
+    elif http2:
+        arguments.append("http2=True")
+    if cookies:
+        arguments.append(f"cookies={cookies}")
+    if proxy:
+        # one pooled transport per proxy, shared by every request of the client
+        mounts = [f'"all://": {transport(f"proxy={proxy}")}', *(f'"{pattern}": None' for pattern in no_proxy)]
+        arguments.append("mounts={" + ", ".join(mounts) + "}")
+    if not trust_env:
+        arguments.append("trust_env=False")
+    if not verify and not (unix_socket or wrap_transport):
+        arguments.append("verify=False")
+    return arguments
+
+
+def client_setup_code(parsed_context: ParsedContext) -> str:
+    """
+    Create a client when the request needs one, for a unix socket, HTTP/2, a proxy or a cookie jar shared with later
+    requests.
+    """
+    mounts = proxy_mounts(parsed_context.proxy)
+    uses_jar = bool(parsed_context.cookie_file or parsed_context.cookie_jar)
+    # a proxy bypassed with --noproxy '*' still needs a client, to ignore the proxy environment variables like curl
+    if not (parsed_context.unix_socket or parsed_context.http2 or uses_jar or parsed_context.proxy):
+        return ""
+    client_args = httpx_client_arguments(
+        unix_socket=repr(parsed_context.unix_socket) if parsed_context.unix_socket else None,
+        http2=parsed_context.http2,
+        verify=parsed_context.verify,
+        cookies="jar" if uses_jar else None,
+        proxy=f'"{mounts[0][1]}"' if mounts else None,
+        no_proxy=[pattern for pattern, _ in mounts[1:]],
+        trust_env=parsed_context.proxy is None,
+    )
+    return f"client = httpx.Client({', '.join(client_args)})\n"
+
+
+def cookie_jar_lines(cookie_jar: Optional[str], cookie_file: Optional[str]) -> List[str]:
+    """
+    Load the -b cookie file once into a jar that the client updates, and that is saved to the -c file if any.
+    A missing cookie file is skipped, like curl does.
+    :param cookie_jar: The python expression of the -c path, if any.
+    :param cookie_file: The python expression of the -b path, if any.
+    """
+    lines = [f"jar = http.cookiejar.MozillaCookieJar({cookie_jar or ''})"]
+    if cookie_file:
+        lines.append(f"if os.path.exists({cookie_file}):")
+        lines.append(f"    jar.load({cookie_file}, ignore_discard=True, ignore_expires=True)")
+    return lines
+
+
+def save_cookie_jar_code(jar: str = "jar") -> str:
+    return f"{jar}.save(ignore_discard=True, ignore_expires=True)"
+
+
+def cookie_jar_load_code(parsed_context: ParsedContext) -> str:
+    if not (parsed_context.cookie_file or parsed_context.cookie_jar):
+        return ""
+    # repr() keeps quotes and backslashes of the paths, e.g. Windows paths, literal
+    cookie_jar = repr(parsed_context.cookie_jar) if parsed_context.cookie_jar else None
+    cookie_file = repr(parsed_context.cookie_file) if parsed_context.cookie_file else None
+    return "".join(f"{line}\n" for line in cookie_jar_lines(cookie_jar, cookie_file))
+
+
+def cookie_jar_save_code(parsed_context: ParsedContext) -> str:
+    return save_cookie_jar_code() + "\n" if parsed_context.cookie_jar else ""
+
+
+def make_dirs_code(directory: str) -> str:
+    return f"os.makedirs({directory}, exist_ok=True)"
+
+
+def write_chunks_code(path: str, chunks: str, indent: str = "", asynchronous: bool = False) -> str:
+    """
+    Write a response to a file chunk by chunk, so that memory use stays flat however large it is.
+    :param path: The python expression of the file path.
+    :param chunks: The python expression iterating over the response body.
+    """
+    loop = "async for" if asynchronous else "for"
+    return (
+        f'{indent}with open({path}, "wb") as output:\n'
+        f"{indent}    {loop} chunk in {chunks}:\n"
+        f"{indent}        output.write(chunk)"
+    )
+
+
+def stream_to_file_code(parsed_context: ParsedContext, request: str) -> str:
+    """
+    Send `request`, a `.stream(...)` call, and write its response to `parsed_context.output` in chunks.
+    Without --compressed the bytes are written as received, like curl does, and decoded with it.
+    """
+    output_dir = os.path.dirname(parsed_context.output)
+    make_dirs = make_dirs_code(repr(output_dir)) + "\n" if parsed_context.create_dirs and output_dir else ""
+    iterator = "iter_bytes" if parsed_context.compressed else "iter_raw"
+    write = write_chunks_code(repr(parsed_context.output), f"response.{iterator}()", indent="    ")
+    return f"{make_dirs}with {request} as response:\n{write}\n"
+
+
+def stream_to_file(parsed_context: ParsedContext, formatter: Mapping[str, str]) -> str:
+    """
+    Render a request whose response is written to `parsed_context.output` in chunks, so memory use stays constant.
+    """
+    request = """{client}.stream("{method}", "{url}",
+{requests_kargs}{data_token}{headers_token}{cookies_token}{auth}{security_token})""".format(**formatter)
     return """
-{client_setup}{client}.{method}("{url}",
-{requests_kargs}{data_token}{headers_token}{cookies_token}{auth}{proxies}{security_token})
-""".format(**formatter).strip()
+{imports}{client_setup}{stream}{cookie_jar_save}""".format(
+        **formatter, stream=stream_to_file_code(parsed_context, request)
+    ).strip()
 
 
 def parse_curl_range(range_str: str) -> str:
@@ -262,6 +641,27 @@ def parse_curl_range(range_str: str) -> str:
     return f"{unit}={formatted_ranges}"
 
 
+def form_files_to_string(form_data: List[FormField]) -> str:
+    """
+    Render form fields as the source of a httpx `files=` argument.
+    File parts are passed as open file handles, so httpx streams them from disk.
+    """
+    fields = [(field.name, _form_field_to_string(field)) for field in form_data]
+    if len({name for name, _ in fields}) == len(fields):
+        return "{" + ", ".join("{!r}: {}".format(name, value) for name, value in fields) + "}"
+    return "[" + ", ".join("({!r}, {})".format(name, value) for name, value in fields) + "]"
+
+
+def _form_field_to_string(field: FormField) -> str:
+    content = "open({!r}, 'rb')".format(field.path) if field.path else repr(field.value)
+    if field.filename and not field.content_type and field.filename == os.path.basename(field.path):
+        return content
+    parts = [repr(field.filename), content]
+    if field.content_type:
+        parts.append(repr(field.content_type))
+    return "({})".format(", ".join(parts))
+
+
 def dict_to_pretty_string(the_dict: Mapping[str, Any], indent=4) -> str:
     if not the_dict:
         return "{}"
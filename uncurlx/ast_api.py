@@ -1,22 +1,36 @@
 import ast
-from typing import List, Optional, Union
+import os
+from typing import List, Union
 
-from .api import parse_context
+from .api import (
+    FormField,
+    ParsedContext,
+    client_setup_code,
+    cookie_jar_load_code,
+    cookie_jar_save_code,
+    parse_context,
+    required_imports,
+    stream_to_file_code,
+)
 
 
 def parse(curl_command: Union[str, List[str]], **kargs) -> str:
-    parsed_context = parse_context(curl_command)
-
-    tree = ast.Interactive(body=[])
-    func_call_id = ast.Name(id="httpx")
-    if parsed_context.unix_socket:
-        tree.body.append(
-            ast.Assign(
-                targets=[ast.Name(id="client")],
-                value=_make_client_constructor(parsed_context.unix_socket),
-            )
-        )
-        func_call_id = ast.Name(id="client")
+    return unparse_context(parse_context(curl_command), **kargs)
+
+
+def unparse_context(parsed_context: ParsedContext, **kargs) -> str:
+    """
+    Generate the httpx code for an already parsed curl command.
+    """
+    return ast.unparse(ast.fix_missing_locations(build_module(parsed_context, **kargs)))  # Python 3.9+
+
+
+def build_module(parsed_context: ParsedContext, **kargs) -> ast.Module:
+    """
+    Build the syntax tree of the httpx code for an already parsed curl command.
+    """
+    tree = ast.Module(body=_make_setup_statements(parsed_context), type_ignores=[])
+    func_call_id = ast.Name(id="client" if client_setup_code(parsed_context) else "httpx")
 
     # Create the base function call node
     func_call = ast.Call(
@@ -36,29 +50,21 @@ def parse(curl_command: Union[str, List[str]], **kargs) -> str:
     # Add constant values
     constant_values = {
         "content": parsed_context.content,
-        "data": parsed_context.form_data,
-        "json": parsed_context.json,
+        # the json body is kept as the repr of the decoded data, so it is inserted as a literal, not a string
+        "json": parsed_context.json and ast.parse(parsed_context.json, mode="eval").body,
         "params": parsed_context.params,
     }
     for key, value in constant_values.items():
         if value:
-            func_call.keywords.append(ast.keyword(arg=key, value=ast.Constant(value=value)))
+            value = value if isinstance(value, ast.expr) else ast.Constant(value=value)
+            func_call.keywords.append(ast.keyword(arg=key, value=value))
+    if parsed_context.form_data:
+        func_call.keywords.append(ast.keyword(arg="files", value=_make_form_files(parsed_context.form_data)))
     # headers
     func_call.keywords.append(_handle_headers(parsed_context.headers, tuple_as_list=True))
 
     # Add dictionary values
-    dict_values: dict[str, Optional[dict[str, str]]] = {
-        "cookies": parsed_context.cookies or {},
-        "proxy": parsed_context.proxy or None,
-    }
-    for key, value in dict_values.items():
-        if value is not None:
-            func_call.keywords.append(
-                ast.keyword(
-                    arg=key,
-                    value=ast.Constant(value=dict(value)),
-                )
-            )
+    func_call.keywords.append(ast.keyword(arg="cookies", value=ast.Constant(value=dict(parsed_context.cookies or {}))))
 
     # Add tuple values
     if parsed_context.auth:
@@ -68,12 +74,39 @@ def parse(curl_command: Union[str, List[str]], **kargs) -> str:
                 value=ast.Tuple(elts=[ast.Constant(v) for v in parsed_context.auth]),
             )
         )
-    # add auth line
-    if not parsed_context.verify:
+    # a client takes verify=False itself, only the top-level httpx functions accept it per request
+    if not parsed_context.verify and func_call_id.id == "httpx":
         func_call.keywords.append(ast.keyword(arg="verify", value=ast.Constant(False)))
     # Convert the AST to Python code
-    tree.body.append(func_call)
-    return ast.unparse(tree)  # Python 3.9+
+    tree.body.extend(_make_request_statements(func_call, parsed_context))
+    tree.body.extend(ast.parse(cookie_jar_save_code(parsed_context)).body)
+    return tree
+
+
+def _make_setup_statements(parsed_context: ParsedContext) -> List[ast.stmt]:
+    """
+    Imports, the cookie jar and `client = httpx.Client(...)` when the request needs a client.
+    """
+    statements: List[ast.stmt] = [
+        ast.Import(names=[ast.alias(name=module)]) for module in required_imports(parsed_context)
+    ]
+    # the client and cookie jar are parsed from the source of the string backend, so both always agree
+    statements.extend(ast.parse(cookie_jar_load_code(parsed_context) + client_setup_code(parsed_context)).body)
+    return statements
+
+
+def _make_request_statements(func_call: ast.Call, parsed_context: ParsedContext) -> List[ast.stmt]:
+    """
+    Issue the request, or with an output file, turn `client.method(url, ...)` into a `client.stream(method, url, ...)`
+    block writing the response in chunks.
+    """
+    if not parsed_context.output:
+        return [ast.Expr(func_call)]
+    func_call.args.insert(0, ast.Constant(func_call.func.attr))
+    func_call.func.attr = "stream"
+    statements = ast.parse(stream_to_file_code(parsed_context, "request")).body
+    statements[-1].items[0].context_expr = func_call
+    return statements
 
 
 def _handle_headers(headers: Union[dict, list[tuple[str, str]]], tuple_as_list: bool = False) -> ast.keyword:
@@ -117,21 +150,25 @@ def _maybe_sort_headers(
         raise ValueError("Headers must be a dictionary or a list of tuples.")
 
 
-def _make_client_constructor(uds: str) -> ast.Call:
-    return ast.Call(
-        func=ast.Attribute(
-            value=ast.Name(id="httpx"),
-            attr="Client",
-        ),
-        args=[],
-        keywords=[
-            ast.keyword(
-                arg="transport",
-                value=ast.Call(
-                    func=ast.Attribute(value=ast.Name(id="httpx"), attr="HTTPTransport"),
-                    args=[],
-                    keywords=[ast.keyword(arg="uds", value=ast.Constant(value=uds))],
-                ),
-            ),
-        ],
-    )
+def _make_form_files(form_data: List[FormField]) -> ast.expr:
+    fields = [(ast.Constant(field.name), _make_form_field(field)) for field in form_data]
+    if len({field.name for field in form_data}) == len(form_data):
+        return ast.Dict(keys=[name for name, _ in fields], values=[value for _, value in fields])
+    return ast.List(elts=[ast.Tuple(elts=[name, value]) for name, value in fields])
+
+
+def _make_form_field(field: FormField) -> ast.expr:
+    if field.path:
+        content = ast.Call(
+            func=ast.Name(id="open"),
+            args=[ast.Constant(field.path), ast.Constant("rb")],
+            keywords=[],
+        )
+    else:
+        content = ast.Constant(field.value)
+    if field.filename and not field.content_type and field.filename == os.path.basename(field.path):
+        return content
+    elts = [ast.Constant(field.filename), content]
+    if field.content_type:
+        elts.append(ast.Constant(field.content_type))
+    return ast.Tuple(elts=elts)
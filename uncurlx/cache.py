@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+"""
+A private HTTP cache for replayed GET requests, as a httpx transport wrapping the one doing the actual requests.
+It is inlined into the code generated with `cache=True`, and can be used by any httpx client replaying captures.
+Responses are kept in memory or on disk with size-bounded LRU eviction, fresh ones are served without a request,
+stale ones are revalidated with `If-None-Match`/`If-Modified-Since`, and hits, revalidations and misses are counted.
+"""
+
+import atexit
+import email.utils
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict, deque
+
+import httpx
+
+CACHEABLE_METHODS = ("GET", "HEAD")
+# statuses that can be stored without explicit freshness information, RFC 9111 section 4.2.2
+CACHEABLE_STATUSES = (200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501)
+# requests with one of these headers are sent as they are, and their responses are not stored
+UNCACHED_REQUEST_HEADERS = ("range", "if-match", "if-none-match", "if-modified-since", "if-unmodified-since")
+# headers of a 304 response describing its own empty body rather than the stored one
+UNMERGED_HEADERS = ("content-length", "content-encoding", "transfer-encoding")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# without max-age or Expires, a response stays fresh for this fraction of the time since it was last modified
+HEURISTIC_FRACTION = 0.1
+
+
+class CacheStats:
+    """
+    Counts of lookups served from the cache (`hits`), after a 304 (`revalidated`) or by the server (`misses`).
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    @property
+    def lookups(self):
+        return self.hits + self.revalidated + self.misses
+
+    @property
+    def hit_rate(self):
+        return (self.hits + self.revalidated) / self.lookups if self.lookups else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.lookups} lookups, {self.hits} hits, {self.revalidated} revalidated, {self.misses} misses, "
+            f"{self.stored} stored, {self.evicted} evicted, hit rate {self.hit_rate:.1%}"
+        )
+
+
+CACHE_STATS = CacheStats()
+_summary_installed = False
+
+
+class MemoryStorage:
+    """
+    Keep responses in memory, evicting the least recently used ones beyond `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # entry sizes, in least recently used order
+        self._sizes = OrderedDict()
+        self._responses = {}
+
+    def get(self, key):
+        name = self._name(key)
+        if name not in self._sizes:
+            return None
+        entry = self._read(name)
+        if entry is None:
+            self._discard(name)
+        else:
+            self._sizes.move_to_end(name)
+        return entry
+
+    def set(self, key, meta, content):
+        """
+        Store a response and its JSON-serializable metadata, and return the number of entries evicted for it.
+        A response larger than the whole cache is not stored, and None is returned.
+        """
+        name = self._name(key)
+        self._discard(name)
+        if len(content) > self.max_bytes:
+            return None
+        self._sizes[name] = self._write(name, meta, content)
+        self.size += self._sizes[name]
+        return self._evict()
+
+    def delete(self, key):
+        self._discard(self._name(key))
+
+    def _evict(self):
+        evicted = 0
+        while self.size > self.max_bytes:
+            self._discard(next(iter(self._sizes)))
+            evicted += 1
+        return evicted
+
+    def _discard(self, name):
+        size = self._sizes.pop(name, None)
+        if size is not None:
+            self.size -= size
+            self._remove(name)
+
+    def _name(self, key):
+        return key
+
+    def _read(self, name):
+        return self._responses.get(name)
+
+    def _write(self, name, meta, content):
+        self._responses[name] = (meta, content)
+        return len(content)
+
+    def _remove(self, name):
+        self._responses.pop(name, None)
+
+
+class DiskStorage(MemoryStorage):
+    """
+    Keep responses in `directory`, one file per response holding a line of JSON metadata followed by the body.
+    Reads touch the files, so the least recently used order carries over to the next run.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(max_bytes)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        cached_files = [entry for entry in os.scandir(directory) if entry.name.endswith(".cache")]
+        for entry in sorted(cached_files, key=lambda entry: entry.stat().st_mtime):
+            self._sizes[entry.name] = entry.stat().st_size
+        self.size = sum(self._sizes.values())
+        self._evict()
+
+    def _name(self, key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".cache"
+
+    def _read(self, name):
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as cached:
+                meta = json.loads(cached.readline())
+                content = cached.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return meta, content
+
+    def _write(self, name, meta, content):
+        path = os.path.join(self.directory, name)
+        data = json.dumps(meta).encode("utf-8") + b"\n" + content
+        # written to a file of its own and renamed, so that concurrent runs never read or write a partial file
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as cached:
+            cached.write(data)
+        os.replace(cached.name, path)
+        return len(data)
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def parse_cache_control(value):
+    directives = {}
+    for directive in value.split(","):
+        name, _, argument = directive.partition("=")
+        if name.strip():
+            directives[name.strip().lower()] = argument.strip().strip('"')
+    return directives
+
+
+def _seconds(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _timestamp(value):
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def cache_key(request):
+    """
+    The key a request's response is stored under, or None if it must not be served from or stored in the cache.
+    """
+    if request.method not in CACHEABLE_METHODS:
+        return None
+    if "no-store" in parse_cache_control(request.headers.get("Cache-Control", "")):
+        return None
+    if any(name in request.headers for name in UNCACHED_REQUEST_HEADERS):
+        return None
+    return f"{request.method} {request.url}"
+
+
+def _vary(request, headers):
+    names = [name.strip().lower() for name in headers.get("Vary", "").split(",") if name.strip()]
+    return {name: request.headers.get(name) for name in names}
+
+
+def is_storable(response):
+    cache_control = parse_cache_control(response.headers.get("Cache-Control", ""))
+    if "no-store" in cache_control or "*" in response.headers.get("Vary", ""):
+        return False
+    has_freshness = "max-age" in cache_control or "Expires" in response.headers
+    has_validator = "ETag" in response.headers or "Last-Modified" in response.headers
+    return response.status_code in CACHEABLE_STATUSES and (has_freshness or has_validator)
+
+
+def freshness_lifetime(headers, stored_at):
+    """
+    How many seconds a response stays fresh: its max-age, its Expires date or a fraction of its Last-Modified age.
+    """
+    cache_control = parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-cache" in cache_control:
+        return 0
+    max_age = _seconds(cache_control.get("max-age"))
+    if max_age is not None:
+        return max_age
+    date = _timestamp(headers.get("Date")) or stored_at
+    if "Expires" in headers:
+        # an invalid Expires date means the response is already expired
+        expires = _timestamp(headers["Expires"])
+        return max(expires - date, 0) if expires is not None else 0
+    last_modified = _timestamp(headers.get("Last-Modified"))
+    if last_modified is not None:
+        return max(date - last_modified, 0) * HEURISTIC_FRACTION
+    return 0
+
+
+def _age(meta):
+    headers = httpx.Headers(meta["headers"])
+    return (_seconds(headers.get("Age")) or 0) + max(time.time() - meta["stored_at"], 0)
+
+
+def is_fresh(meta, request):
+    request_directives = parse_cache_control(request.headers.get("Cache-Control", ""))
+    if "no-cache" in request_directives or request.headers.get("Pragma") == "no-cache":
+        return False
+    age = _age(meta)
+    max_age = _seconds(request_directives.get("max-age"))
+    if max_age is not None and age > max_age:
+        return False
+    return age < freshness_lifetime(httpx.Headers(meta["headers"]), meta["stored_at"])
+
+
+def conditional_request(request, meta):
+    """
+    A copy of the request asking the server to answer 304 if the stored response is still valid.
+    """
+    headers = httpx.Headers(meta["headers"])
+    validators = {}
+    if "ETag" in headers:
+        validators["If-None-Match"] = headers["ETag"]
+    if "Last-Modified" in headers:
+        validators["If-Modified-Since"] = headers["Last-Modified"]
+    if not validators:
+        return request
+    return httpx.Request(
+        request.method,
+        request.url,
+        headers=[*request.headers.multi_items(), *validators.items()],
+        stream=request.stream,
+        extensions=request.extensions,
+    )
+
+
+def cached_response(meta, content, cache_status):
+    headers = httpx.Headers(meta["headers"])
+    headers["Age"] = str(int(_age(meta)))
+    return httpx.Response(
+        meta["status"],
+        headers=headers,
+        stream=httpx.ByteStream(content),
+        extensions={"cache_status": cache_status},
+    )
+
+
+class _CachePolicy:
+    def __init__(self, transport=None, storage=None, stats=None):
+        self.transport = transport if transport is not None else self._default_transport()
+        self.storage = storage if storage is not None else MemoryStorage()
+        self.stats = stats if stats is not None else CACHE_STATS
+
+    def _lookup(self, key, request):
+        entry = self.storage.get(key)
+        if entry is not None and entry[0]["vary"] != _vary(request, httpx.Headers(entry[0]["headers"])):
+            return None
+        return entry
+
+    def _invalidate(self, request, response):
+        # a successful unsafe request makes the stored responses for its URL obsolete, RFC 9111 section 4.4
+        if request.method not in ("GET", "HEAD", "OPTIONS", "TRACE") and response.status_code < 400:
+            for method in CACHEABLE_METHODS:
+                self.storage.delete(f"{method} {request.url}")
+
+    def _needs_body(self, response, entry):
+        if response.status_code == 304 and entry is not None:
+            return True
+        content_length = _seconds(response.headers.get("Content-Length"))
+        too_large = content_length is not None and content_length > self.storage.max_bytes
+        if too_large or not is_storable(response):
+            self.stats.misses += 1
+            return False
+        return True
+
+    def _store(self, key, entry, request, response, content):
+        if response.status_code == 304 and entry is not None:
+            meta, content = entry
+            headers = httpx.Headers(meta["headers"])
+            headers.pop("Age", None)
+            for name, value in response.headers.items():
+                if name.lower() not in UNMERGED_HEADERS:
+                    headers[name] = value
+            meta = {**meta, "headers": headers.multi_items(), "stored_at": time.time()}
+            self.stats.revalidated += 1
+            self.stats.evicted += self.storage.set(key, meta, content) or 0
+            return cached_response(meta, content, "revalidated")
+        self.stats.misses += 1
+        meta = {
+            "status": response.status_code,
+            "headers": response.headers.multi_items(),
+            "stored_at": time.time(),
+            "vary": _vary(request, response.headers),
+        }
+        evicted = self.storage.set(key, meta, content)
+        if evicted is not None:
+            self.stats.stored += 1
+            self.stats.evicted += evicted
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=httpx.ByteStream(content),
+            extensions={**response.extensions, "cache_status": "miss"},
+        )
+
+
+class _PassThroughStream(httpx.SyncByteStream):
+    """
+    The already buffered chunks of a response too large to be stored, followed by the rest of its body.
+    """
+
+    def __init__(self, chunks, rest, stream):
+        self._chunks = chunks
+        self._rest = rest
+        self._stream = stream
+
+    def __iter__(self):
+        while self._chunks:
+            yield self._chunks.popleft()
+        yield from self._rest
+
+    def close(self):
+        self._stream.close()
+
+
+class _AsyncPassThroughStream(httpx.AsyncByteStream):
+    def __init__(self, chunks, rest, stream):
+        self._chunks = chunks
+        self._rest = rest
+        self._stream = stream
+
+    async def __aiter__(self):
+        while self._chunks:
+            yield self._chunks.popleft()
+        async for chunk in self._rest:
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+def _replace_stream(response, stream):
+    return httpx.Response(response.status_code, headers=response.headers, stream=stream, extensions=response.extensions)
+
+
+class CachingTransport(_CachePolicy, httpx.BaseTransport):
+    """
+    A httpx transport answering GET and HEAD requests from a cache, and sending the others to `transport`.
+    :param transport: The transport sending requests to the server, a new `httpx.HTTPTransport()` by default.
+    :param storage: A `MemoryStorage` (the default) or a `DiskStorage`, which can be shared by several transports.
+    :param stats: The `CacheStats` to count lookups in, the module's `CACHE_STATS` by default.
+    Responses carry a `cache_status` extension: `"hit"`, `"revalidated"` or `"miss"`.
+    """
+
+    _default_transport = httpx.HTTPTransport
+
+    def handle_request(self, request):
+        key = cache_key(request)
+        if key is None:
+            response = self.transport.handle_request(request)
+            self._invalidate(request, response)
+            return response
+        entry = self._lookup(key, request)
+        if entry is not None and is_fresh(entry[0], request):
+            self.stats.hits += 1
+            return cached_response(*entry, "hit")
+        response = self.transport.handle_request(conditional_request(request, entry[0]) if entry else request)
+        if not self._needs_body(response, entry):
+            return response
+        # the body is buffered up to max_bytes only, a larger one is passed through without being stored
+        chunks, size = deque(), 0
+        rest = iter(response.stream)
+        for chunk in rest:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.storage.max_bytes:
+                self.stats.misses += 1
+                return _replace_stream(response, _PassThroughStream(chunks, rest, response.stream))
+        response.stream.close()
+        return self._store(key, entry, request, response, b"".join(chunks))
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncCachingTransport(_CachePolicy, httpx.AsyncBaseTransport):
+    """
+    The `CachingTransport` for `httpx.AsyncClient`, wrapping a `httpx.AsyncHTTPTransport()` by default.
+    """
+
+    _default_transport = httpx.AsyncHTTPTransport
+
+    async def handle_async_request(self, request):
+        key = cache_key(request)
+        if key is None:
+            response = await self.transport.handle_async_request(request)
+            self._invalidate(request, response)
+            return response
+        entry = self._lookup(key, request)
+        if entry is not None and is_fresh(entry[0], request):
+            self.stats.hits += 1
+            return cached_response(*entry, "hit")
+        response = await self.transport.handle_async_request(
+            conditional_request(request, entry[0]) if entry else request
+        )
+        if not self._needs_body(response, entry):
+            return response
+        chunks, size = deque(), 0
+        rest = response.stream.__aiter__()
+        async for chunk in rest:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.storage.max_bytes:
+                self.stats.misses += 1
+                return _replace_stream(response, _AsyncPassThroughStream(chunks, rest, response.stream))
+        await response.stream.aclose()
+        return self._store(key, entry, request, response, b"".join(chunks))
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def print_cache_summary(file=None):
+    if CACHE_STATS.lookups:
+        print(f"# cache: {CACHE_STATS}", file=file or sys.stderr)
+
+
+def install_cache_summary():
+    """
+    Print the cache statistics on exit. Safe to call more than once.
+    """
+    global _summary_installed
+    if not _summary_installed:
+        _summary_installed = True
+        atexit.register(print_cache_summary)
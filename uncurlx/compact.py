@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+A compact, slotted alternative to `ParsedContext` for holding large batches of parsed commands in memory.
+"""
+
+import sys
+from typing import Iterator, List, Optional, Tuple, Union
+
+from .api import ParsedContext, collapse_headers, parse_context
+
+
+class CompactContext:
+    """
+    Memory-lean equivalent of a `ParsedContext`.
+    Headers and cookies are stored as flat, parallel tuples of names and values, with the names (and the method)
+    interned so that a million contexts share one copy of `"Accept-Encoding"`.
+    Use `to_context()` to get the regular `ParsedContext` back.
+    """
+
+    __slots__ = (
+        "method",
+        "url",
+        "content",
+        "form_data",
+        "header_names",
+        "header_values",
+        "cookie_names",
+        "cookie_values",
+        "verify",
+        "auth",
+        "proxy",
+        "unix_socket",
+        "json",
+        "http2",
+        "output",
+        "create_dirs",
+        "compressed",
+        "cookie_file",
+        "cookie_jar",
+    )
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        content: str = "",
+        form_data: tuple = (),
+        header_names: Tuple[str, ...] = (),
+        header_values: Tuple[str, ...] = (),
+        cookie_names: Tuple[str, ...] = (),
+        cookie_values: Tuple[str, ...] = (),
+        verify: bool = True,
+        auth: tuple = (),
+        proxy=None,
+        unix_socket: str = "",
+        json=None,
+        http2: bool = False,
+        output: Optional[str] = None,
+        create_dirs: bool = False,
+        compressed: bool = False,
+        cookie_file: Optional[str] = None,
+        cookie_jar: Optional[str] = None,
+    ):
+        if len(header_names) != len(header_values) or len(cookie_names) != len(cookie_values):
+            raise ValueError("Header and cookie names must have one value each.")
+        self.method = sys.intern(method)
+        self.url = url
+        self.content = content
+        self.form_data = tuple(form_data)
+        self.header_names = tuple(sys.intern(name) for name in header_names)
+        self.header_values = tuple(header_values)
+        self.cookie_names = tuple(sys.intern(name) for name in cookie_names)
+        self.cookie_values = tuple(cookie_values)
+        self.verify = verify
+        self.auth = auth
+        self.proxy = proxy
+        self.unix_socket = unix_socket
+        self.json = json
+        self.http2 = http2
+        self.output = output
+        self.create_dirs = create_dirs
+        self.compressed = compressed
+        self.cookie_file = cookie_file
+        self.cookie_jar = cookie_jar
+
+    @classmethod
+    def from_context(cls, parsed_context: ParsedContext) -> "CompactContext":
+        headers = parsed_context.headers
+        header_items = list(headers.items()) if isinstance(headers, dict) else list(headers)
+        cookie_items = list(parsed_context.cookies.items())
+        return cls(
+            method=parsed_context.method,
+            url=parsed_context.url,
+            content=parsed_context.content,
+            form_data=parsed_context.form_data,
+            header_names=tuple(name for name, _ in header_items),
+            header_values=tuple(value for _, value in header_items),
+            cookie_names=tuple(name for name, _ in cookie_items),
+            cookie_values=tuple(value for _, value in cookie_items),
+            verify=parsed_context.verify,
+            auth=parsed_context.auth,
+            proxy=parsed_context.proxy,
+            unix_socket=parsed_context.unix_socket,
+            json=parsed_context.json,
+            http2=parsed_context.http2,
+            output=parsed_context.output,
+            create_dirs=parsed_context.create_dirs,
+            compressed=parsed_context.compressed,
+            cookie_file=parsed_context.cookie_file,
+            cookie_jar=parsed_context.cookie_jar,
+        )
+
+    def headers(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.header_names, self.header_values)
+
+    def cookies(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.cookie_names, self.cookie_values)
+
+    def to_context(self) -> ParsedContext:
+        """
+        Convert back to a `ParsedContext`, with headers as an `OrderedDict` unless a header name is repeated,
+        in which case they are a list of tuples, just like `parse_context` returns them.
+        """
+        return ParsedContext(
+            method=self.method,
+            url=self.url,
+            content=self.content,
+            params=[],
+            form_data=list(self.form_data),
+            headers=collapse_headers(list(self.headers())),
+            cookies=dict(self.cookies()),
+            verify=self.verify,
+            auth=self.auth,
+            proxy=self.proxy,
+            unix_socket=self.unix_socket,
+            json=self.json,
+            http2=self.http2,
+            output=self.output,
+            create_dirs=self.create_dirs,
+            compressed=self.compressed,
+            cookie_file=self.cookie_file,
+            cookie_jar=self.cookie_jar,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactContext):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"CompactContext(method={self.method!r}, url={self.url!r}, headers={len(self.header_names)})"
+
+
+def parse_compact(curl_command: Union[str, List[str]]) -> CompactContext:
+    """
+    Parse a curl command straight into a CompactContext.
+    """
+    return CompactContext.from_context(parse_context(curl_command))
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Generate scripts that download the target of a curl GET command in parallel ranged chunks.
+"""
+
+from string import Template
+from typing import Any, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from .api import ParsedContext, bypasses_proxy, parse_context, proxy_url
+
+DEFAULT_CHUNKS = 8
+DEFAULT_OUTPUT = "download.bin"
+
+# headers the download script sets itself, one range per chunk and no content-encoding so offsets stay exact
+SKIPPED_HEADERS = ("range", "accept-encoding")
+
+DOWNLOAD_TEMPLATE = Template('''import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import httpx
+
+URL = $url
+OUTPUT = $output
+HEADERS = $headers
+CLIENT_OPTIONS = $client_options
+FIRST_BYTE = $first_byte
+LAST_BYTE = $last_byte
+CHUNKS = $chunks
+PROGRESS = OUTPUT + ".progress"
+# byte offsets and sizes must be those of the stored bytes, not of a decoded body
+IDENTITY = ("Accept-Encoding", "identity")
+
+
+def content_length(client):
+    """Find the size of the resource with a HEAD request, falling back to a 0-0 range probe."""
+    response = client.head(URL, headers=[*HEADERS, IDENTITY], follow_redirects=True)
+    if response.headers.get("Accept-Ranges") == "bytes" and "Content-Length" in response.headers:
+        return int(response.headers["Content-Length"])
+    probe_headers = [*HEADERS, IDENTITY, ("Range", "bytes=0-0")]
+    with client.stream("GET", URL, headers=probe_headers, follow_redirects=True) as response:
+        if response.status_code != 206:
+            raise RuntimeError(f"{URL} does not support range requests")
+        return int(response.headers["Content-Range"].rpartition("/")[2])
+
+
+def chunk_spans(size):
+    """Split the requested byte range into at most CHUNKS inclusive (start, end) spans."""
+    first = FIRST_BYTE if FIRST_BYTE >= 0 else max(size + FIRST_BYTE, 0)
+    last = size - 1 if LAST_BYTE is None else min(LAST_BYTE, size - 1)
+    step = max(-(-(last - first + 1) // CHUNKS), 1)
+    return [(start, min(start + step, last + 1) - 1) for start in range(first, last + 1, step)]
+
+
+def load_progress(size, spans):
+    """
+    Return the indexes of the chunks finished by an earlier, interrupted run.
+    They are only reused for the same resource size and chunk spans, i.e. the same --range and number of chunks.
+    """
+    if not (os.path.exists(PROGRESS) and os.path.exists(OUTPUT)):
+        return set()
+    with open(PROGRESS) as progress_file:
+        progress = json.load(progress_file)
+    if progress.get("size") != size or progress.get("spans") != [list(span) for span in spans]:
+        return set()
+    return set(progress["done"])
+
+
+def save_progress(size, spans, done):
+    with open(PROGRESS, "w") as progress_file:
+        json.dump({"size": size, "spans": spans, "done": sorted(done)}, progress_file)
+
+
+def preallocate(length):
+    with open(OUTPUT, "wb") as output:
+        output.truncate(length)
+
+
+def fetch_chunk(client, start, end, offset):
+    chunk_headers = [*HEADERS, IDENTITY, ("Range", f"bytes={start}-{end}")]
+    with client.stream("GET", URL, headers=chunk_headers, follow_redirects=True) as response:
+        if response.status_code != 206:
+            raise RuntimeError(f"expected a partial response for bytes {start}-{end}, got {response.status_code}")
+        with open(OUTPUT, "r+b") as output:
+            output.seek(offset)
+            for data in response.iter_raw():
+                output.write(data)
+
+
+def download(client):
+    size = content_length(client)
+    spans = chunk_spans(size)
+    done = load_progress(size, spans)
+    if not done:
+        preallocate(spans[-1][1] - spans[0][0] + 1 if spans else 0)
+    first = spans[0][0] if spans else 0
+    with ThreadPoolExecutor(max_workers=CHUNKS) as executor:
+        futures = {
+            executor.submit(fetch_chunk, client, start, end, start - first): index
+            for index, (start, end) in enumerate(spans)
+            if index not in done
+        }
+        for future in as_completed(futures):
+            future.result()
+            done.add(futures[future])
+            save_progress(size, spans, done)
+    if os.path.exists(PROGRESS):
+        os.remove(PROGRESS)
+    return sum(end - start + 1 for start, end in spans)
+
+
+if __name__ == "__main__":
+    limits = httpx.Limits(max_connections=CHUNKS, max_keepalive_connections=CHUNKS)
+    with httpx.Client(limits=limits, **CLIENT_OPTIONS) as client:
+        print(f"wrote {download(client)} bytes to {OUTPUT}")
+''')
+
+
+def parse_download(
+    curl_command: Union[str, List[str]],
+    output: Optional[str] = None,
+    chunks: int = DEFAULT_CHUNKS,
+) -> str:
+    """
+    Convert a curl GET command into a script that downloads it as `chunks` concurrent ranged requests.
+    The script finds the size with a HEAD request (or a 0-0 range probe), preallocates the output file,
+    writes each chunk at its offset, and records finished chunks so an interrupted download can resume.
+    :param curl_command: The curl command to convert, either as a string or a list of strings.
+    :param output: The file to write to, defaults to the command's -o/-O output or the last segment of the url path.
+    :param chunks: The number of ranges to split the download into.
+    :return: The source of the download script.
+    """
+    parsed_context = parse_context(curl_command)
+    if parsed_context.method != "get" or parsed_context.content or parsed_context.form_data or parsed_context.json:
+        raise ValueError("Download mode only supports GET requests without a body.")
+    if parsed_context.unix_socket:
+        raise ValueError("Download mode does not support --unix-socket.")
+    if parsed_context.cookie_file or parsed_context.cookie_jar:
+        raise ValueError("Download mode does not support cookie files (-b FILE, -c/--cookie-jar).")
+    if chunks < 1:
+        raise ValueError("The number of chunks must be at least 1.")
+
+    headers = _header_items(parsed_context.headers)
+    range_header = next((value for key, value in headers if key.lower() == "range"), None)
+    first_byte, last_byte = parse_byte_range(range_header)
+    return DOWNLOAD_TEMPLATE.substitute(
+        url=repr(parsed_context.url),
+        output=repr(output or parsed_context.output or _default_output(parsed_context.url)),
+        headers=_format_header_list([(k, v) for k, v in headers if k.lower() not in SKIPPED_HEADERS]),
+        client_options=repr(_client_options(parsed_context)),
+        first_byte=repr(first_byte),
+        last_byte=repr(last_byte),
+        chunks=repr(chunks),
+    )
+
+
+def parse_byte_range(range_header: Optional[str]) -> Tuple[int, Optional[int]]:
+    """
+    Parse a `Range` header value into the first and last byte to download.
+    A negative first byte is a suffix length, and a last byte of `None` means the end of the resource.
+    """
+    if not range_header:
+        return 0, None
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        raise ValueError("Download mode only supports a single byte range.", range_header)
+    start, _, end = ranges.strip().partition("-")
+    if not start:
+        return -int(end), None
+    return int(start), int(end) if end else None
+
+
+def _header_items(headers: Any) -> List[Tuple[str, str]]:
+    return list(headers.items()) if isinstance(headers, dict) else list(headers)
+
+
+def _format_header_list(headers: List[Tuple[str, str]]) -> str:
+    if not headers:
+        return "[]"
+    return "[\n" + "".join(f"    ({key!r}, {value!r}),\n" for key, value in headers) + "]"
+
+
+def _client_options(parsed_context: ParsedContext) -> dict:
+    client_options = {}
+    if parsed_context.cookies:
+        client_options["cookies"] = dict(parsed_context.cookies)
+    if parsed_context.auth:
+        client_options["auth"] = parsed_context.auth
+    if not parsed_context.verify:
+        client_options["verify"] = False
+    if parsed_context.http2:
+        client_options["http2"] = True
+    # every chunk goes to the same url, so a single proxy covers --noproxy too
+    if parsed_context.proxy and not bypasses_proxy(parsed_context.url, parsed_context.proxy):
+        client_options["proxy"] = proxy_url(parsed_context.proxy)
+    elif parsed_context.proxy:
+        # a bypassed proxy is a direct connection, not one through the proxy environment variables
+        client_options["trust_env"] = False
+    return client_options
+
+
+def _default_output(url: str) -> str:
+    return urlsplit(url).path.rstrip("/").rpartition("/")[2] or DEFAULT_OUTPUT
@@ -0,0 +1,526 @@
+# -*- coding: utf-8 -*-
+"""
+A registry of code emitters for different HTTP client libraries.
+Every emitter renders the same intermediate `RequestModel`, built once from a `ParsedContext`, into a small module
+with a `make_client()` function returning a pooled client and a `send(client)` function issuing the request on it,
+so the converted request can be repeated on one connection pool.
+"""
+
+import ast
+import base64
+import inspect
+import os
+import pkgutil
+from collections import namedtuple
+from pprint import pformat
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+from urllib.parse import unquote, urlsplit
+
+from .api import (
+    FormField,
+    ParsedContext,
+    bypasses_proxy,
+    cookie_jar_lines,
+    form_files_to_string,
+    httpx_client_arguments,
+    make_dirs_code,
+    no_proxy_patterns,
+    parse_context,
+    proxy_url,
+    save_cookie_jar_code,
+    write_chunks_code,
+)
+
+RequestModel = namedtuple(
+    "RequestModel",
+    [
+        "method",
+        "url",
+        "headers",
+        "cookies",
+        "content",
+        "json",
+        "form",
+        "auth",
+        "verify",
+        "http2",
+        "unix_socket",
+        "proxy",
+        "no_proxy",
+        "trust_env",
+        "output",
+        "create_dirs",
+        "compressed",
+        "cookie_file",
+        "cookie_jar",
+    ],
+)
+
+# emitters take the RequestModel, and optionally keyword-only codegen options such as `instrument`
+Emitter = Callable[..., str]
+
+EMITTERS: Dict[str, Emitter] = {}
+
+DEFAULT_TARGET = "httpx"
+
+
+def register_emitter(name: str) -> Callable[[Emitter], Emitter]:
+    """
+    Register a function turning a RequestModel into source code as the emitter for the `name` target.
+    """
+
+    def decorator(emitter: Emitter) -> Emitter:
+        EMITTERS[name] = emitter
+        return emitter
+
+    return decorator
+
+
+def build_request_model(parsed_context: ParsedContext) -> RequestModel:
+    """
+    Build the library-independent request model shared by all emitters.
+    """
+    headers = parsed_context.headers
+    # the generated module sends one request, so a proxy bypassed for its host is left out altogether
+    proxy = None if bypasses_proxy(parsed_context.url, parsed_context.proxy) else proxy_url(parsed_context.proxy)
+    return RequestModel(
+        method=parsed_context.method.upper(),
+        url=parsed_context.url,
+        headers=list(headers.items()) if isinstance(headers, Mapping) else list(headers),
+        cookies=dict(parsed_context.cookies),
+        content=parsed_context.content or None,
+        json=ast.literal_eval(parsed_context.json) if parsed_context.json else None,
+        form=list(parsed_context.form_data),
+        auth=tuple(parsed_context.auth) if parsed_context.auth else None,
+        verify=parsed_context.verify,
+        http2=parsed_context.http2,
+        unix_socket=parsed_context.unix_socket or None,
+        proxy=proxy,
+        no_proxy=parsed_context.proxy.no_proxy if proxy else (),
+        # curl ignores the proxy environment variables once -x is given, even when the host bypasses the proxy
+        trust_env=parsed_context.proxy is None,
+        output=parsed_context.output,
+        create_dirs=parsed_context.create_dirs,
+        compressed=parsed_context.compressed,
+        cookie_file=parsed_context.cookie_file,
+        cookie_jar=parsed_context.cookie_jar,
+    )
+
+
+def emit(curl_command: Union[str, List[str]], target: str = DEFAULT_TARGET, **options: Any) -> str:
+    """
+    Convert a curl command into a module for the `target` client library.
+    :param curl_command: The curl command to convert, either as a string or a list of strings.
+    :param target: The name of a registered emitter, see `EMITTERS`.
+    :param options: Codegen options supported by the emitter, e.g. `instrument=True` for the httpx targets.
+    :return: The generated source code.
+    """
+    if target not in EMITTERS:
+        raise ValueError(f"Unknown target {target!r}, expected one of: {', '.join(sorted(EMITTERS))}.")
+    emitter = EMITTERS[target]
+    unsupported = set(options) - set(list(inspect.signature(emitter).parameters)[1:])
+    if unsupported:
+        raise ValueError(f"The {target} target does not support: {', '.join(sorted(unsupported))}.")
+    return emitter(build_request_model(parse_context(curl_command)), **options)
+
+
+def _literal(value: Any) -> str:
+    return pformat(value, sort_dicts=False, width=100)
+
+
+def _headers_literal(headers: List[tuple]) -> str:
+    if len({name.lower() for name, _ in headers}) == len(headers):
+        return _literal(dict(headers))
+    return _literal(headers)
+
+
+def _constants(model: RequestModel, headers: str, **extra: Any) -> str:
+    lines = [f"URL = {_literal(model.url)}", f"HEADERS = {headers}"]
+    lines.extend(f"{name.upper()} = {_literal(value)}" for name, value in extra.items() if value is not None)
+    if model.content is not None:
+        lines.append(f"CONTENT = {_literal(model.content)}")
+    if model.json is not None:
+        lines.append(f"JSON = {_literal(model.json)}")
+    return "\n".join(lines)
+
+
+def _imports(model: RequestModel, third_party: str, *stdlib: str) -> str:
+    modules = set(stdlib)
+    if _uses_cookie_jar(model):
+        modules.add("http.cookiejar")
+    if model.cookie_file or _output_dir(model):
+        modules.add("os")
+    return "".join(f"import {module}\n" for module in sorted(modules)) + ("\n" if modules else "") + third_party
+
+
+def _uses_cookie_jar(model: RequestModel) -> bool:
+    return bool(model.cookie_file or model.cookie_jar)
+
+
+def _output_dir(model: RequestModel) -> str:
+    return os.path.dirname(model.output) if model.output and model.create_dirs else ""
+
+
+def _reject_cookie_files(model: RequestModel, target: str) -> None:
+    if _uses_cookie_jar(model):
+        raise ValueError(f"The {target} target does not support cookie files (-b FILE, -c/--cookie-jar).")
+
+
+def _write_output(chunks: str, indent: str, asynchronous: bool = False) -> str:
+    """
+    The lines of `send` writing the response to the -o file chunk by chunk, so that memory use stays flat.
+    """
+    return "\n" + write_chunks_code("OUTPUT", chunks, indent, asynchronous)
+
+
+def _make_output_dir(model: RequestModel) -> str:
+    return make_dirs_code("os.path.dirname(OUTPUT)") + "\n    " if _output_dir(model) else ""
+
+
+def _main_output(model: RequestModel, status: str, body: str) -> str:
+    return f'print({status}, "saved to", OUTPUT)' if model.output else f"print({status}, {body})"
+
+
+def _call(func: str, arguments: List[str], indent: str) -> str:
+    if not arguments:
+        return f"{func}()"
+    inner = "".join(f"{indent}    {argument},\n" for argument in arguments)
+    return f"{func}(\n{inner}{indent})"
+
+
+def _module_source(module: str) -> str:
+    # modules are inlined without their docstring, so that the generated scripts stay standalone; they are read as
+    # data rather than imported, so the emitters do not need the libraries they use
+    source = pkgutil.get_data(__package__, f"{module}.py").decode("utf-8")
+    docstring_end = ast.parse(source).body[0].end_lineno
+    return "\n".join(source.splitlines()[docstring_end:]).strip()
+
+
+def _inlined_modules(instrument: bool, cache: bool, cache_dir: Optional[str]) -> str:
+    blocks = []
+    if instrument:
+        blocks.append(f"# request timing\n{_module_source('timing')}")
+    if cache or cache_dir:
+        storage = f"DiskStorage({cache_dir!r})" if cache_dir else "MemoryStorage()"
+        blocks.append(f"# response cache\n{_module_source('cache')}\n\nCACHE_STORAGE = {storage}")
+    return "".join(f"\n\n\n{block}" for block in blocks)
+
+
+def _httpx_make_client(model: RequestModel, asynchronous: bool, instrument: bool, cache: bool) -> str:
+    setup = ["install()"] if instrument else []
+    if cache:
+        setup.append("install_cache_summary()")
+    if _uses_cookie_jar(model):
+        # the -b file is loaded once into the jar shared by the client, and the jar is saved to -c on exit
+        setup.extend(
+            cookie_jar_lines("COOKIE_JAR" if model.cookie_jar else None, "COOKIE_FILE" if model.cookie_file else None)
+        )
+    return "\n    ".join([*setup, f"return {_httpx_client(model, asynchronous, instrument, cache)}"])
+
+
+def _httpx_client(model: RequestModel, asynchronous: bool, instrument: bool = False, cache: bool = False) -> str:
+    prefix = "Async" if asynchronous else ""
+    arguments = []
+    if instrument:
+        hooks = ("async_start_timer", "async_finish_timer") if asynchronous else ("start_timer", "finish_timer")
+        arguments.append(f'event_hooks={{"request": [{hooks[0]}], "response": [{hooks[1]}]}}')
+    if _uses_cookie_jar(model):
+        arguments.append("cookies=jar")
+    elif model.cookies:
+        arguments.append("cookies=COOKIES")
+    if model.auth:
+        arguments.append("auth=AUTH")
+    wrap_transport = None
+    if cache:
+
+        def wrap_transport(transport: str) -> str:
+            return f"{prefix}CachingTransport({transport}, CACHE_STORAGE)"
+
+    arguments.extend(
+        httpx_client_arguments(
+            unix_socket=repr(model.unix_socket) if model.unix_socket else None,
+            http2=model.http2,
+            verify=model.verify,
+            proxy="PROXY" if model.proxy else None,
+            no_proxy=no_proxy_patterns(model.no_proxy) if model.proxy else (),
+            trust_env=model.trust_env,
+            prefix=prefix,
+            wrap_transport=wrap_transport,
+        )
+    )
+    return _call(f"httpx.{prefix}Client", arguments, "    ")
+
+
+def _httpx_request(model: RequestModel) -> List[str]:
+    arguments = [repr(model.method), "URL", "headers=HEADERS"]
+    if model.cookies and _uses_cookie_jar(model):
+        # sent with the request only, like curl does not save -b name=value cookies to the -c jar
+        arguments.append("cookies=COOKIES")
+    if model.content is not None:
+        arguments.append("content=CONTENT")
+    if model.json is not None:
+        arguments.append("json=JSON")
+    if model.form:
+        arguments.append(f"files={form_files_to_string(model.form)}")
+    return arguments
+
+
+def _httpx_send(model: RequestModel, asynchronous: bool) -> str:
+    awaited = "await " if asynchronous else ""
+    if not model.output:
+        return f"return {awaited}{_call('client.request', _httpx_request(model), '    ')}"
+    iterator = "bytes" if model.compressed else "raw"
+    chunks = f"response.aiter_{iterator}()" if asynchronous else f"response.iter_{iterator}()"
+    stream = _call("client.stream", _httpx_request(model), "    ")
+    with_statement = "async with" if asynchronous else "with"
+    return (
+        f"{_make_output_dir(model)}{with_statement} {stream} as response:"
+        f"{_write_output(chunks, '        ', asynchronous)}\n    return response"
+    )
+
+
+def _httpx_main(model: RequestModel, awaited: str) -> str:
+    lines = [f"response = {awaited}send(client)"]
+    if model.cookie_jar:
+        lines.append(save_cookie_jar_code("client.cookies.jar"))
+    lines.append(_main_output(model, "response.status_code", "response.text"))
+    return "\n        ".join(lines)
+
+
+def _httpx_constants(model: RequestModel) -> str:
+    return _constants(
+        model,
+        _headers_literal(model.headers),
+        cookies=model.cookies or None,
+        auth=model.auth,
+        proxy=model.proxy,
+        output=model.output,
+        cookie_file=model.cookie_file,
+        cookie_jar=model.cookie_jar,
+    )
+
+
+@register_emitter("httpx")
+def emit_httpx(
+    model: RequestModel, *, instrument: bool = False, cache: bool = False, cache_dir: Optional[str] = None
+) -> str:
+    return f"""{_imports(model, "import httpx")}
+
+{_httpx_constants(model)}{_inlined_modules(instrument, cache, cache_dir)}
+
+
+def make_client():
+    {_httpx_make_client(model, asynchronous=False, instrument=instrument, cache=bool(cache or cache_dir))}
+
+
+def send(client):
+    {_httpx_send(model, asynchronous=False)}
+
+
+if __name__ == "__main__":
+    with make_client() as client:
+        {_httpx_main(model, "")}
+"""
+
+
+@register_emitter("httpx-async")
+def emit_httpx_async(
+    model: RequestModel, *, instrument: bool = False, cache: bool = False, cache_dir: Optional[str] = None
+) -> str:
+    return f"""{_imports(model, "import httpx", "asyncio")}
+
+{_httpx_constants(model)}{_inlined_modules(instrument, cache, cache_dir)}
+
+
+def make_client():
+    {_httpx_make_client(model, asynchronous=True, instrument=instrument, cache=bool(cache or cache_dir))}
+
+
+async def send(client):
+    {_httpx_send(model, asynchronous=True)}
+
+
+async def main():
+    async with make_client() as client:
+        {_httpx_main(model, "await ")}
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+"""
+
+
+def _is_socks(proxy: Optional[str]) -> bool:
+    return bool(proxy) and proxy.startswith("socks")
+
+
+def _cookie_header(cookies: Mapping[str, str]) -> List[tuple]:
+    return [("Cookie", "; ".join(f"{name}={value}" for name, value in cookies.items()))] if cookies else []
+
+
+def _basic_auth_header(auth: Optional[tuple]) -> List[tuple]:
+    if not auth:
+        return []
+    return [("Authorization", "Basic " + base64.b64encode(":".join(auth).encode("utf-8")).decode("ascii"))]
+
+
+def _urllib3_field(field: FormField) -> str:
+    if field.path and field.filename:
+        parts = [repr(field.filename), f"open({field.path!r}, 'rb').read()"]
+        if field.content_type:
+            parts.append(repr(field.content_type))
+        return f"({', '.join(parts)})"
+    return f"open({field.path!r}, 'rb').read()" if field.path else repr(field.value)
+
+
+def _urllib3_manager(model: RequestModel) -> Tuple[str, str, List[str]]:
+    """
+    The imports, the pool manager class and its arguments for the urllib3 target.
+    """
+    manager_arguments = ["maxsize=10"]
+    if not model.verify:
+        manager_arguments.append('cert_reqs="CERT_NONE"')
+    manager = "urllib3.PoolManager"
+    imports = "import urllib3"
+    if model.proxy:
+        manager = "urllib3.ProxyManager"
+        manager_arguments.insert(0, "PROXY")
+        proxy = urlsplit(model.proxy)
+        if proxy.username is not None and not _is_socks(model.proxy):
+            # ProxyManager ignores credentials in the proxy URL
+            credentials = unquote(proxy.username) + ("" if proxy.password is None else ":" + unquote(proxy.password))
+            manager_arguments.append(f"proxy_headers=urllib3.make_headers(proxy_basic_auth={credentials!r})")
+    if _is_socks(model.proxy):
+        # SOCKSProxyManager needs the `urllib3[socks]` extra
+        manager = "SOCKSProxyManager"
+        imports += "\nfrom urllib3.contrib.socks import SOCKSProxyManager"
+    return imports, manager, manager_arguments
+
+
+@register_emitter("urllib3")
+def emit_urllib3(model: RequestModel) -> str:
+    if model.unix_socket:
+        raise ValueError("The urllib3 target does not support --unix-socket.")
+    _reject_cookie_files(model, "urllib3")
+    headers = model.headers + _cookie_header(model.cookies)
+    headers_literal = _headers_literal(headers)
+    if headers_literal.startswith("["):
+        headers_literal = f"urllib3.HTTPHeaderDict({headers_literal})"
+    constants = _constants(model, headers_literal, proxy=model.proxy, output=model.output)
+    if model.auth:
+        constants += f"\nHEADERS.update(urllib3.make_headers(basic_auth={':'.join(model.auth)!r}))"
+
+    imports, manager, manager_arguments = _urllib3_manager(model)
+
+    request_arguments = [repr(model.method), "URL", "headers=HEADERS"]
+    if model.content is not None:
+        request_arguments.append("body=CONTENT")
+    if model.json is not None:
+        request_arguments.append("json=JSON")
+    if model.form:
+        fields = ", ".join(f"({field.name!r}, {_urllib3_field(field)})" for field in model.form)
+        request_arguments.append(f"fields=[{fields}]")
+    if model.output:
+        request_arguments.append("preload_content=False")
+        chunks = f"response.stream(decode_content={model.compressed})"
+        send = (
+            f"{_make_output_dir(model)}response = {_call('client.request', request_arguments, '    ')}"
+            f"{_write_output(chunks, '    ')}\n    response.release_conn()\n    return response"
+        )
+    else:
+        send = f"return {_call('client.request', request_arguments, '    ')}"
+    return f"""{_imports(model, imports)}
+
+{constants}
+
+
+def make_client():
+    return {_call(manager, manager_arguments, "    ")}
+
+
+def send(client):
+    {send}
+
+
+if __name__ == "__main__":
+    response = send(make_client())
+    {_main_output(model, "response.status", 'response.data.decode(errors="replace")')}
+"""
+
+
+def _aiohttp_form(form: List[FormField]) -> str:
+    lines = ["def form_data():", "    form = aiohttp.FormData(default_to_multipart=True)"]
+    for field in form:
+        arguments = [repr(field.name), f"open({field.path!r}, 'rb')" if field.path else repr(field.value)]
+        if field.filename:
+            arguments.append(f"filename={field.filename!r}")
+        if field.content_type:
+            arguments.append(f"content_type={field.content_type!r}")
+        lines.append(f"    form.add_field({', '.join(arguments)})")
+    lines.append("    return form")
+    return "\n\n\n" + "\n".join(lines)
+
+
+def _aiohttp_session(model: RequestModel) -> List[str]:
+    session_arguments = []
+    if model.cookies:
+        session_arguments.append("cookies=COOKIES")
+    if model.output and not model.compressed:
+        # like curl, the -o file gets the body as sent unless --compressed is given
+        session_arguments.append("auto_decompress=False")
+    if model.unix_socket:
+        session_arguments.append(f"connector=aiohttp.UnixConnector(path={model.unix_socket!r})")
+    elif not model.verify:
+        session_arguments.append("connector=aiohttp.TCPConnector(ssl=False)")
+    return session_arguments
+
+
+@register_emitter("aiohttp")
+def emit_aiohttp(model: RequestModel) -> str:
+    if _is_socks(model.proxy):
+        raise ValueError("The aiohttp target does not support SOCKS proxies.")
+    _reject_cookie_files(model, "aiohttp")
+    # aiohttp deprecates its `auth=` parameters in favour of an explicit Authorization header
+    headers = model.headers + _basic_auth_header(model.auth)
+    constants = _constants(
+        model, _headers_literal(headers), cookies=model.cookies or None, proxy=model.proxy, output=model.output
+    )
+
+    request_arguments = [repr(model.method), "URL", "headers=HEADERS"]
+    if model.content is not None:
+        request_arguments.append("data=CONTENT")
+    if model.json is not None:
+        request_arguments.append("json=JSON")
+    if model.form:
+        request_arguments.append("data=form_data()")
+    if model.proxy:
+        request_arguments.append("proxy=PROXY")
+    if model.output:
+        chunks = "response.content.iter_chunked(65536)"
+        read = f"{_write_output(chunks, '    ', asynchronous=True)}\n    response.release()"
+    else:
+        # reading the body releases the connection back to the pool, and keeps it available to the caller
+        read = "\n    await response.read()"
+    return f"""{_imports(model, "import aiohttp", "asyncio")}
+
+{constants}{_aiohttp_form(model.form) if model.form else ""}
+
+
+def make_client():
+    return {_call("aiohttp.ClientSession", _aiohttp_session(model), "    ")}
+
+
+async def send(client):
+    {_make_output_dir(model)}response = await {_call("client.request", request_arguments, "    ")}{read}
+    return response
+
+
+async def main():
+    async with make_client() as client:
+        response = await send(client)
+        {_main_output(model, "response.status", "await response.text()")}
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+"""
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Write many converted requests as a package instead of one huge module.
+Requests are sharded into submodules by host (or by host and first path segment), each request is a function so its
+header and cookie literals are only built when it is called, and the package `__init__` only holds a name index that
+a module-level `__getattr__` uses to import the right submodule on first access.
+"""
+
+import ast
+import keyword
+import os
+import re
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Mapping
+from urllib.parse import urlsplit
+
+from .api import ParsedContext
+from .ast_api import build_module
+
+GROUP_BY = ("host", "path")
+
+NON_IDENTIFIER = re.compile(r"\W+")
+
+INIT_TEMPLATE = '''"""
+Requests converted by uncurlx. Each request is a function, its submodule is imported on first use.
+"""
+
+import importlib
+
+_INDEX = {index}
+
+__all__ = sorted(_INDEX)
+
+
+def __getattr__(name):
+    if name not in _INDEX:
+        raise AttributeError(f"module {{__name__!r}} has no attribute {{name!r}}")
+    return getattr(importlib.import_module(f".{{_INDEX[name]}}", __name__), name)
+
+
+def __dir__():
+    return __all__
+'''
+
+
+def identifier(text: str, prefix: str) -> str:
+    """
+    Turn arbitrary text (a host name, a path) into a lowercase python identifier.
+    """
+    name = NON_IDENTIFIER.sub("_", text).strip("_").lower()
+    if not name or name[0].isdigit() or keyword.iskeyword(name):
+        name = f"{prefix}_{name}".rstrip("_")
+    return name
+
+
+def shard_name(url: str, group_by: str = "host") -> str:
+    """
+    The submodule a request goes to: its host, or its host and first path segment.
+    """
+    parts = urlsplit(url)
+    name = parts.hostname or "local"
+    if group_by == "path":
+        first_segment = parts.path.strip("/").partition("/")[0]
+        name = f"{name}_{first_segment}" if first_segment else name
+    return identifier(name, "host")
+
+
+def function_name(parsed_context: ParsedContext) -> str:
+    return identifier(f"{parsed_context.method}_{urlsplit(parsed_context.url).path.strip('/')}", "request")
+
+
+def request_function(parsed_context: ParsedContext, name: str) -> ast.FunctionDef:
+    """
+    Wrap the code generated for a request in a function returning its response.
+    """
+    body = build_module(parsed_context).body
+    for index, statement in enumerate(body):
+        # the request is the only bare expression besides `os.makedirs(...)` and `jar.save(...)`
+        if isinstance(statement, ast.Expr) and not _is_setup_call(statement.value):
+            body[index] = ast.Assign(targets=[ast.Name(id="response")], value=statement.value)
+    docstring = ast.Expr(ast.Constant(f"{parsed_context.method.upper()} {parsed_context.url}"))
+    # type parameters only exist from python 3.12
+    type_params = {"type_params": []} if sys.version_info >= (3, 12) else {}
+    return ast.FunctionDef(
+        name=name,
+        args=ast.arguments(posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=[docstring, *body, ast.Return(ast.Name(id="response"))],
+        decorator_list=[],
+        returns=None,
+        **type_params,
+    )
+
+
+def _is_setup_call(node: ast.expr) -> bool:
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id in ("jar", "os")
+    )
+
+
+def build_package(parsed_contexts: Iterable[ParsedContext], group_by: str = "host") -> Dict[str, str]:
+    """
+    Generate the source of a package holding one function per request.
+    :param parsed_contexts: The requests to convert.
+    :param group_by: Shard the submodules by `"host"`, or by host and first path segment with `"path"`.
+    :return: A mapping of file names (`__init__.py` and one file per shard) to their source.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"Unknown grouping {group_by!r}, expected one of: {', '.join(GROUP_BY)}.")
+    shards: Dict[str, List[ast.FunctionDef]] = OrderedDict()
+    index: Dict[str, str] = OrderedDict()
+    for parsed_context in parsed_contexts:
+        shard = shard_name(parsed_context.url, group_by)
+        name = base_name = function_name(parsed_context)
+        count = 1
+        while name in index:
+            count += 1
+            name = f"{base_name}_{count}"
+        index[name] = shard
+        shards.setdefault(shard, []).append(request_function(parsed_context, name))
+
+    files = {"__init__.py": INIT_TEMPLATE.format(index=_format_index(index))}
+    for shard, functions in shards.items():
+        sources = [ast.unparse(ast.fix_missing_locations(function)) for function in functions]
+        files[f"{shard}.py"] = "import httpx\n\n\n" + "\n\n\n".join(sources) + "\n"
+    return files
+
+
+def _format_index(index: Mapping[str, str]) -> str:
+    if not index:
+        return "{}"
+    return "{\n" + "".join(f"    {name!r}: {shard!r},\n" for name, shard in index.items()) + "}"
+
+
+def write_package(parsed_contexts: Iterable[ParsedContext], directory: str, group_by: str = "host") -> List[str]:
+    """
+    Write the package generated by `build_package` to `directory`, creating it if needed.
+    :return: The paths of the files written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for filename, source in build_package(parsed_contexts, group_by).items():
+        path = os.path.join(directory, filename)
+        with open(path, "w", encoding="utf-8") as package_file:
+            package_file.write(source)
+        paths.append(path)
+    return paths
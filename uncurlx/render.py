@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Render httpx requests back into curl commands, e.g. to log failing requests in a reproducible form.
+The output is quoted with `shlex` rules, so it round-trips through `parse_context`.
+"""
+
+import json
+import logging
+import shlex
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_MAX_BODY = 4096
+DEFAULT_CACHE_SIZE = 512
+REDACTED = "REDACTED"
+
+SECRET_HEADERS = frozenset(
+    ["authorization", "proxy-authorization", "cookie", "set-cookie", "x-api-key", "x-auth-token", "x-csrf-token"]
+)
+SECRET_PARAMS = frozenset(["access_token", "api_key", "apikey", "key", "password", "secret", "signature", "token"])
+# set by httpx from the URL and the body, and recomputed by curl
+DERIVED_HEADERS = frozenset(["host", "content-length", "transfer-encoding"])
+
+
+class CurlRenderer:
+    """
+    Render requests as curl commands, with the options that are the same for every request of a client rendered once.
+    Rendered `-H` options are kept in a small LRU cache, so the client's default headers are only quoted once.
+    :param max_body: Bodies longer than this many characters are truncated, `None` keeps them whole.
+    :param redact: Replace the values of `SECRET_HEADERS`, URL passwords and `SECRET_PARAMS` in the query string and in
+        form-urlencoded or JSON bodies with `REDACTED`.
+    :param insecure: Add `--insecure`, for clients created with `verify=False`.
+    :param http2: Add `--http2`, for clients created with `http2=True`.
+    :param proxy: Add `--proxy` with this URL.
+    :param unix_socket: Add `--unix-socket` with this path.
+    """
+
+    def __init__(
+        self,
+        max_body: Optional[int] = DEFAULT_MAX_BODY,
+        redact: bool = True,
+        insecure: bool = False,
+        http2: bool = False,
+        proxy: Optional[str] = None,
+        unix_socket: Optional[str] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.max_body = max_body
+        self.redact = redact
+        self.cache_size = cache_size
+        self._header_options: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        options = []
+        if insecure:
+            options.append("--insecure")
+        if http2:
+            options.append("--http2")
+        if proxy:
+            options.extend(["--proxy", self._redact_url(proxy)])
+        if unix_socket:
+            options.extend(["--unix-socket", unix_socket])
+        self.static_options = " ".join(map(shlex.quote, options))
+
+    def __call__(self, request: Any) -> str:
+        """
+        Render a `httpx.Request` (or any object with `method`, `url`, `headers` and `content`) as a curl command.
+        """
+        method = request.method.upper()
+        body = self._body(request)
+        parts = ["curl", shlex.quote(self._redact_url(str(request.url)))]
+        if method != ("POST" if body is not None else "GET"):
+            parts.append(f"-X {shlex.quote(method)}")
+        if self.static_options:
+            parts.append(self.static_options)
+        parts.extend(self._header_option(name, value) for name, value in _header_items(request.headers))
+        if body is not None:
+            parts.append(f"--data-raw {shlex.quote(body)}")
+        return " ".join(parts)
+
+    def _header_option(self, name: str, value: str) -> str:
+        if self.redact and name.lower() in SECRET_HEADERS:
+            value = REDACTED
+        # keyed on the redacted value, so that the cache never holds secrets
+        key = (name, value)
+        option = self._header_options.get(key)
+        if option is None:
+            option = f"-H {shlex.quote(f'{name}: {value}')}"
+            self._header_options[key] = option
+            if len(self._header_options) > self.cache_size:
+                self._header_options.popitem(last=False)
+        else:
+            self._header_options.move_to_end(key)
+        return option
+
+    def _body(self, request: Any) -> Optional[str]:
+        try:
+            content = request.content
+        except RuntimeError:
+            # a streaming body that was never read into memory
+            return "[streamed body omitted]"
+        if not content:
+            return None
+        try:
+            body = content.decode("utf-8")
+        except UnicodeDecodeError:
+            return f"[{len(content)} bytes of binary body omitted]"
+        if self.redact:
+            body = _redact_body(body, _content_type(request.headers))
+        if self.max_body is not None and len(body) > self.max_body:
+            return f"{body[: self.max_body]}[{len(body) - self.max_body} characters truncated]"
+        return body
+
+    def _redact_url(self, url: str) -> str:
+        if not self.redact:
+            return url
+        parts = urlsplit(url)
+        netloc = parts.netloc
+        if parts.password is not None:
+            netloc = netloc.replace(f":{parts.password}@", f":{REDACTED}@", 1)
+        return urlunsplit(parts._replace(netloc=netloc, query=_redact_params(parts.query)))
+
+
+def _redact_params(query: str) -> str:
+    params = parse_qsl(query, keep_blank_values=True)
+    if not any(name.lower() in SECRET_PARAMS for name, _ in params):
+        return query
+    return urlencode([(name, REDACTED if name.lower() in SECRET_PARAMS else value) for name, value in params])
+
+
+def _redact_json(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: REDACTED if key.lower() in SECRET_PARAMS else _redact_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact_json(item) for item in value]
+    return value
+
+
+def _redact_body(body: str, content_type: str) -> str:
+    """
+    Redact `SECRET_PARAMS` in form-urlencoded and JSON bodies, at any depth for JSON.
+    Bodies without secrets are kept as sent, other content types are not inspected.
+    """
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return _redact_params(body)
+    if "json" in content_type:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return body
+        redacted = _redact_json(data)
+        return body if redacted == data else json.dumps(redacted)
+    return body
+
+
+def _content_type(headers: Any) -> str:
+    return next((value.lower() for name, value in _header_items(headers) if name.lower() == "content-type"), "")
+
+
+def _header_items(headers: Any) -> Iterable[Tuple[str, str]]:
+    # httpx keeps the original header casing in `.raw`, as latin-1 encoded bytes
+    raw = getattr(headers, "raw", None)
+    if raw is not None:
+        items: Iterable[Tuple[str, str]] = ((name.decode("latin-1"), value.decode("latin-1")) for name, value in raw)
+    else:
+        items = headers.items()
+    return [(name, value) for name, value in items if name.lower() not in DERIVED_HEADERS]
+
+
+_default_renderer = CurlRenderer()
+
+
+def to_curl(request: Any, renderer: Optional[CurlRenderer] = None) -> str:
+    """
+    Render a httpx request as a curl command.
+    :param request: The request to render, e.g. `response.request` or `exc.request`.
+    :param renderer: A configured CurlRenderer, by default bodies are truncated and secrets are redacted.
+    :return: The curl command, which can be converted back with `parse_context`.
+    """
+    return (renderer or _default_renderer)(request)
+
+
+class LazyCurl:
+    """
+    Defer rendering a request until it is formatted, so log records that are filtered out cost nothing.
+    """
+
+    __slots__ = ("renderer", "request")
+
+    def __init__(self, renderer: CurlRenderer, request: Any):
+        self.renderer = renderer
+        self.request = request
+
+    def __str__(self) -> str:
+        return self.renderer(self.request)
+
+
+def failed_request_hook(
+    renderer: Optional[CurlRenderer] = None,
+    logger: Optional[logging.Logger] = None,
+    level: int = logging.WARNING,
+    asynchronous: bool = False,
+) -> Callable:
+    """
+    Build a httpx `response` event hook logging requests that got an error status as curl commands.
+    Successful responses only cost a status code comparison, and the command is only rendered if the record is emitted.
+    """
+    renderer = renderer or CurlRenderer()
+    logger = logger or logging.getLogger("uncurlx")
+
+    def log_failed_request(response: Any) -> None:
+        if response.status_code >= 400 and logger.isEnabledFor(level):
+            request = response.request
+            logger.log(
+                level,
+                "%s %s failed with %s, reproduce with: %s",
+                request.method,
+                renderer._redact_url(str(request.url)),
+                response.status_code,
+                LazyCurl(renderer, request),
+            )
+
+    if not asynchronous:
+        return log_failed_request
+
+    async def async_log_failed_request(response: Any) -> None:
+        log_failed_request(response)
+
+    return async_log_failed_request
+
+
+def install_curl_logging(client: Any, logger: Optional[logging.Logger] = None, level: int = logging.WARNING, **options):
+    """
+    Add a `failed_request_hook` to a `httpx.Client` or `httpx.AsyncClient`, with one renderer for the whole client.
+    :param options: Arguments of `CurlRenderer`, such as `insecure=True` or `max_body=None`.
+    :return: The CurlRenderer, which can also render `exc.request` for transport errors.
+    """
+    import httpx
+
+    renderer = CurlRenderer(**options)
+    asynchronous = isinstance(client, httpx.AsyncClient)
+    hooks: List[Callable] = client.event_hooks.get("response", [])
+    client.event_hooks = {
+        **client.event_hooks,
+        "response": [*hooks, failed_request_hook(renderer, logger, level, asynchronous)],
+    }
+    return renderer
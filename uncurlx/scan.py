@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Find and parse curl invocations in shell scripts, history files, Dockerfiles and CI logs.
+"""
+
+import io
+import mmap
+import os
+import re
+import shlex
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .api import parse_context
+from .ast_api import unparse_context
+
+ScanResult = namedtuple("ScanResult", ["path", "line", "command", "context", "code", "error"])
+
+# cheap pre-filter: a literal prefix lets the regex engine skip ahead with a fast substring search,
+# a lookbehind would make it test every position of the file
+CURL_PATTERN = re.compile(rb"curl[ \t]")
+# bytes that make a match part of another word, like `libcurl ` or `.curl `
+WORD_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.-")
+# characters that change the quoting state or end the command outside of quotes
+UNQUOTED_SPECIAL = re.compile(rb"[\\'\"$#\n;|&<>()`]")
+DOUBLE_QUOTED_SPECIAL = re.compile(rb'[\\"]')
+# give up on a command with an unterminated quote instead of scanning the rest of a huge file
+MAX_COMMAND_BYTES = 1 << 20
+# memory maps have no `count`, so newlines between two commands are counted one window of this size at a time
+LINE_COUNT_WINDOW = 1 << 16
+# files are scanned in parallel in ranges of about this size, so that the results of one range stay small
+RANGE_BYTES = 1 << 25
+# the ranges submitted to the pool per worker process before waiting for the oldest one
+RANGES_IN_FLIGHT = 2
+
+
+def extract_command(buffer: bytes, start: int) -> Tuple[Optional[bytes], int]:
+    """
+    Extract the shell command starting at `start`, following quotes and `\\`-continuations to find where it ends.
+    Continuations are joined, so the result can be passed straight to `parse_context`.
+    :param buffer: The text to scan (`bytes` or a memory map).
+    :param start: The offset of the `curl` word.
+    :return: The command and the offset just past its end, or `(None, start)` if it has an unterminated quote.
+    """
+    limit = min(len(buffer), start + MAX_COMMAND_BYTES)
+    pieces: List[bytes] = []
+    position = start
+    while True:
+        match = UNQUOTED_SPECIAL.search(buffer, position, limit)
+        if not match:
+            if limit < len(buffer):
+                return None, start
+            pieces.append(buffer[position:limit])
+            position = limit
+            break
+        pieces.append(buffer[position : match.start()])
+        char = match.group()
+        if char in QUOTING_HANDLERS:
+            position = QUOTING_HANDLERS[char](buffer, match.end(), limit, pieces)
+            if position < 0:
+                return None, start
+        elif char == b"#" and buffer[match.start() - 1 : match.start()] not in (b" ", b"\t"):
+            pieces.append(char)
+            position = match.end()
+        else:
+            # an unquoted newline, command separator, redirection or comment ends the command
+            position = match.start()
+            break
+    return b"".join(pieces).rstrip(), position
+
+
+def _skip_escape(buffer: bytes, position: int, limit: int, pieces: List[bytes]) -> int:
+    if buffer[position : position + 1] == b"\n":
+        return position + 1
+    if buffer[position : position + 2] == b"\r\n":
+        return position + 2
+    pieces.append(buffer[position - 1 : position + 1])
+    return position + 1
+
+
+def _skip_single_quoted(buffer: bytes, position: int, limit: int, pieces: List[bytes]) -> int:
+    closing_quote = buffer.find(b"'", position, limit)
+    if closing_quote >= 0:
+        pieces.append(buffer[position - 1 : closing_quote + 1])
+        return closing_quote + 1
+    return -1
+
+
+def _skip_double_quoted(buffer: bytes, position: int, limit: int, pieces: List[bytes]) -> int:
+    pieces.append(b'"')
+    while True:
+        match = DOUBLE_QUOTED_SPECIAL.search(buffer, position, limit)
+        if not match:
+            return -1
+        pieces.append(buffer[position : match.start()])
+        position = match.end()
+        if match.group() == b'"':
+            pieces.append(b'"')
+            return position
+        if buffer[position : position + 1] == b"\n":
+            position += 1
+        else:
+            pieces.append(buffer[position - 1 : position + 1])
+            position += 1
+
+
+def _skip_ansi_c_quoted(buffer: bytes, position: int, limit: int, pieces: List[bytes]) -> int:
+    if buffer[position : position + 1] != b"'":
+        pieces.append(b"$")
+        return position
+    # in $'...' strings, \\' does not end the string
+    end = position + 1
+    while end < limit and buffer[end : end + 1] != b"'":
+        end += 2 if buffer[end : end + 1] == b"\\" else 1
+    if end >= limit:
+        return -1
+    pieces.append(_requote_ansi_c(buffer[position + 1 : end]))
+    return end + 1
+
+
+def _requote_ansi_c(quoted: bytes) -> bytes:
+    """
+    Turn the contents of a `$'...'` string into a plain single-quoted string, since `shlex` does not support them.
+    """
+    escaped = quoted.decode("utf-8", errors="replace").encode("latin-1", errors="backslashreplace")
+    return shlex.quote(escaped.decode("unicode_escape")).encode("utf-8")
+
+
+QUOTING_HANDLERS = {
+    b"\\": _skip_escape,
+    b"'": _skip_single_quoted,
+    b'"': _skip_double_quoted,
+    b"$": _skip_ansi_c_quoted,
+}
+
+
+def count_newlines(buffer: bytes, start: int, end: int) -> int:
+    """
+    Count the newlines in `buffer[start:end]` without copying the whole range out of a memory map.
+    """
+    if isinstance(buffer, bytes):
+        return buffer.count(b"\n", start, end)
+    return sum(
+        buffer[window : min(window + LINE_COUNT_WINDOW, end)].count(b"\n")
+        for window in range(start, end, LINE_COUNT_WINDOW)
+    )
+
+
+def find_commands(buffer: bytes) -> Iterator[Tuple[int, bytes]]:
+    """
+    Find every curl command in `buffer`.
+    :return: An iterator of (1-based line number, command) tuples.
+    """
+    for line, command, _ in _find_commands(buffer, 0, len(buffer)):
+        yield line, command
+
+
+def _find_commands(buffer: bytes, start: int, end: int) -> Iterator[Tuple[int, bytes, int]]:
+    """
+    Find the curl commands starting in `buffer[start:end]`, with lines counted from 1 at `start`.
+    A command may continue past `end`, so each one comes with the offset just past its end.
+    """
+    line = 1
+    counted_until = start
+    position = start
+    while True:
+        match = CURL_PATTERN.search(buffer, position, end)
+        if not match:
+            return
+        if match.start() > 0 and buffer[match.start() - 1] in WORD_BYTES:
+            position = match.end()
+            continue
+        line += count_newlines(buffer, counted_until, match.start())
+        counted_until = match.start()
+        command, position = extract_command(buffer, match.start())
+        if command is None:
+            position = match.end()
+        else:
+            yield line, command, position
+
+
+def scan_file(path: str, generate_code: bool = True) -> Iterator[ScanResult]:
+    """
+    Find, parse and optionally convert every curl command in a file.
+    The file is memory-mapped and results are yielded as they are found, so only one command is held in memory.
+    A file that cannot be read is reported as a result with an error and no line, rather than raised.
+    """
+    try:
+        with open(path, "rb") as scanned_file:
+            if os.fstat(scanned_file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(scanned_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                for line, command, _ in _find_commands(buffer, 0, len(buffer)):
+                    yield _parse_command(path, line, command.decode("utf-8", errors="replace"), generate_code)
+    except OSError as error:
+        yield _unreadable(path, error)
+
+
+def scan_range(path: str, start: int, end: int, generate_code: bool = True) -> Tuple[List[ScanResult], int, int]:
+    """
+    Scan the curl commands starting in the byte range `[start, end)` of a file, in a worker process.
+    :return: The results, with lines counted from 1 at `start`, the number of newlines in the range, and the offset
+        just past the last command, which is beyond `end` when that command continues into the next range.
+    """
+    results = []
+    stop = start
+    try:
+        with open(path, "rb") as scanned_file:
+            if os.fstat(scanned_file.fileno()).st_size == 0:
+                return results, 0, stop
+            with mmap.mmap(scanned_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                end = min(end, len(buffer))
+                for line, command, stop in _find_commands(buffer, start, end):
+                    results.append(_parse_command(path, line, command.decode("utf-8", errors="replace"), generate_code))
+                return results, count_newlines(buffer, start, end), stop
+    except OSError as error:
+        return [_unreadable(path, error)], 0, stop
+
+
+def split_file(path: str, range_bytes: int = RANGE_BYTES) -> List[Tuple[int, int]]:
+    """
+    Split a file into byte ranges of about `range_bytes`, each ending just after a newline.
+    A file that cannot be read is one range, so that its error is reported by `scan_range`.
+    """
+    try:
+        with open(path, "rb") as split:
+            size = os.fstat(split.fileno()).st_size
+            if size <= range_bytes:
+                return [(0, size)]
+            with mmap.mmap(split.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                ranges = []
+                start = 0
+                while start < size:
+                    newline = buffer.find(b"\n", start + range_bytes)
+                    end = size if newline < 0 else newline + 1
+                    ranges.append((start, end))
+                    start = end
+                return ranges
+    except OSError:
+        return [(0, 0)]
+
+
+def _unreadable(path: str, error: OSError) -> ScanResult:
+    return ScanResult(path=path, line=None, command=None, context=None, code=None, error=error.strerror or str(error))
+
+
+def _parse_command(path: str, line: int, command: str, generate_code: bool) -> ScanResult:
+    try:
+        # argparse reports errors on stderr and exits, which is just noise for a single bad match
+        with redirect_stderr(io.StringIO()):
+            parsed_context = parse_context(command)
+        code = unparse_context(parsed_context) if generate_code else None
+    except SystemExit:
+        return ScanResult(path=path, line=line, command=command, context=None, code=None, error="invalid arguments")
+    except ValueError as error:
+        return ScanResult(path=path, line=line, command=command, context=None, code=None, error=str(error))
+    return ScanResult(path=path, line=line, command=command, context=parsed_context, code=code, error=None)
+
+
+def iter_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    yield os.path.join(directory, filename)
+        else:
+            yield path
+
+
+RangeResults = Tuple[str, int, int, Tuple[List[ScanResult], int, int]]
+
+
+def _shift_lines(results: List[ScanResult], lines: int) -> List[ScanResult]:
+    return [result if result.line is None else result._replace(line=result.line + lines) for result in results]
+
+
+def _scan_ranges(
+    executor: ProcessPoolExecutor, ranges: List[Tuple[str, int, int]], window: int, generate_code: bool
+) -> Iterator[RangeResults]:
+    """
+    Scan the ranges in the pool, in order, with at most `window` of them submitted and not yet consumed.
+    """
+    pending: deque = deque()
+    for path, start, end in ranges:
+        pending.append((path, start, end, executor.submit(scan_range, path, start, end, generate_code)))
+        if len(pending) >= window:
+            path, start, end, future = pending.popleft()
+            yield path, start, end, future.result()
+    while pending:
+        path, start, end, future = pending.popleft()
+        yield path, start, end, future.result()
+
+
+def _join_ranges(scanned: Iterable[RangeResults], generate_code: bool) -> Iterator[ScanResult]:
+    """
+    Turn the results of consecutive ranges into results with file line numbers.
+    A range that begins inside a command of the previous one is scanned again from where that command ends.
+    """
+    path, line, resume = None, 1, 0
+    for range_path, start, end, (results, newlines, stop) in scanned:
+        if range_path != path:
+            path, line, resume = range_path, 1, 0
+        if resume > start:
+            if resume < end:
+                results, remaining, stop = scan_range(path, resume, end, generate_code)
+                results = _shift_lines(results, newlines - remaining)
+            else:
+                results = []
+        yield from _shift_lines(results, line - 1)
+        line += newlines
+        resume = max(resume, stop)
+
+
+def scan_paths(
+    paths: Iterable[str],
+    processes: Optional[int] = None,
+    generate_code: bool = True,
+) -> Iterator[ScanResult]:
+    """
+    Scan files and directories for curl commands, spreading newline-aligned byte ranges of the files over a pool of
+    processes, so that a single large file is scanned in parallel too.
+    Results are streamed range by range, in the order the files were given.
+    :param paths: Files or directories (scanned recursively) to search.
+    :param processes: The number of worker processes, defaults to the number of CPUs. Use 1 to scan in-process.
+    :param generate_code: Whether to also generate the httpx code for each command.
+    """
+    if processes == 1:
+        for path in iter_files(paths):
+            yield from scan_file(path, generate_code)
+        return
+    ranges = [(path, start, end) for path in iter_files(paths) for start, end in split_file(path, RANGE_BYTES)]
+    if len(ranges) <= 1:
+        for path, _, _ in ranges:
+            yield from scan_file(path, generate_code)
+        return
+    window = RANGES_IN_FLIGHT * (processes or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from _join_ranges(_scan_ranges(executor, ranges, window, generate_code), generate_code)
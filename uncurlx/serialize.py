@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Serialize parsed curl commands to a stable, versioned JSON schema, one request per line (JSONL).
+"""
+
+import ast
+import base64
+import json
+from typing import IO, Any, Iterable, Iterator, List, Mapping, Optional, Union
+
+from .api import FormField, ParsedContext, Proxy, collapse_headers, parse_context, parse_proxy
+
+SCHEMA_VERSION = 2
+# version 1 held the proxy as a {"http": url, "https": url} mapping, version 2 holds the fields of a `Proxy`
+SUPPORTED_VERSIONS = (1, SCHEMA_VERSION)
+
+
+def context_to_dict(parsed_context: ParsedContext, **extra: Any) -> dict:
+    """
+    Convert a ParsedContext into plain JSON-serializable data.
+    Headers are always a list of [name, value] pairs, raw bodies are base64-encoded and `--json` bodies are data.
+    :param parsed_context: The context to convert.
+    :param extra: Additional top-level keys, such as the `source` of a scanned command.
+    :return: A dictionary following version `SCHEMA_VERSION` of the schema.
+    """
+    headers = parsed_context.headers
+    header_items = headers.items() if isinstance(headers, Mapping) else headers
+    return {
+        "version": SCHEMA_VERSION,
+        "method": parsed_context.method.upper(),
+        "url": parsed_context.url,
+        "headers": [[name, value] for name, value in header_items],
+        "cookies": dict(parsed_context.cookies),
+        "content_base64": base64.b64encode(parsed_context.content.encode("utf-8")).decode("ascii")
+        if parsed_context.content
+        else None,
+        "json": ast.literal_eval(parsed_context.json) if parsed_context.json else None,
+        "form": [field._asdict() for field in parsed_context.form_data],
+        "auth": list(parsed_context.auth) if parsed_context.auth else None,
+        "proxy": dict(parsed_context.proxy._asdict(), no_proxy=list(parsed_context.proxy.no_proxy))
+        if parsed_context.proxy
+        else None,
+        "verify": parsed_context.verify,
+        "unix_socket": parsed_context.unix_socket or None,
+        "http2": parsed_context.http2,
+        "output": parsed_context.output,
+        "create_dirs": parsed_context.create_dirs,
+        "compressed": parsed_context.compressed,
+        "cookie_file": parsed_context.cookie_file,
+        "cookie_jar": parsed_context.cookie_jar,
+        **extra,
+    }
+
+
+def context_from_dict(data: Mapping[str, Any]) -> ParsedContext:
+    """
+    Rebuild a ParsedContext from the output of `context_to_dict`, in the current or any earlier version of the schema.
+    """
+    if data.get("version") not in SUPPORTED_VERSIONS:
+        raise ValueError("Unsupported schema version.", data.get("version"))
+    content = data["content_base64"]
+    return ParsedContext(
+        method=data["method"].lower(),
+        url=data["url"],
+        content=base64.b64decode(content).decode("utf-8") if content else "",
+        params=[],
+        form_data=[FormField(**field) for field in data["form"]],
+        headers=collapse_headers([(name, value) for name, value in data["headers"]]),
+        cookies=dict(data["cookies"]),
+        verify=data["verify"],
+        auth=tuple(data["auth"]) if data["auth"] else (),
+        proxy=_proxy_from_dict(data["proxy"]),
+        unix_socket=data["unix_socket"] or "",
+        json=repr(data["json"]) if data["json"] is not None else None,
+        http2=data["http2"],
+        # added after the first release of the schema, so older lines may not have them
+        output=data.get("output"),
+        create_dirs=data.get("create_dirs", False),
+        compressed=data.get("compressed", False),
+        cookie_file=data.get("cookie_file"),
+        cookie_jar=data.get("cookie_jar"),
+    )
+
+
+def _proxy_from_dict(proxy: Optional[Mapping[str, Any]]) -> Optional[Proxy]:
+    if not proxy:
+        return None
+    if "host" not in proxy:
+        # version 1 lines hold a {"http": url, "https": url} mapping
+        return parse_proxy(proxy.get("https") or proxy.get("http"), None)
+    return Proxy(**dict(proxy, no_proxy=tuple(proxy["no_proxy"])))
+
+
+def context_to_json(parsed_context: ParsedContext, **extra: Any) -> str:
+    """
+    Serialize a ParsedContext as a single line of JSON.
+    """
+    return json.dumps(context_to_dict(parsed_context, **extra), ensure_ascii=False, separators=(",", ":"))
+
+
+def dump_jsonl(contexts: Iterable[Union[ParsedContext, Mapping[str, Any]]], fp: IO[str]) -> int:
+    """
+    Write contexts to `fp` as they are produced, one JSON object per line.
+    :param contexts: ParsedContexts, or dictionaries already converted with `context_to_dict`.
+    :return: The number of lines written.
+    """
+    count = 0
+    for parsed_context in contexts:
+        if isinstance(parsed_context, Mapping):
+            fp.write(json.dumps(parsed_context, ensure_ascii=False, separators=(",", ":")) + "\n")
+        else:
+            fp.write(context_to_json(parsed_context) + "\n")
+        count += 1
+    return count
+
+
+def iter_jsonl(fp: IO[str]) -> Iterator[ParsedContext]:
+    """
+    Read contexts back from a JSONL stream written by `dump_jsonl`.
+    """
+    for line in fp:
+        if line.strip():
+            yield context_from_dict(json.loads(line))
+
+
+def parse_jsonl(curl_commands: Iterable[Union[str, List[str]]], fp: IO[str]) -> int:
+    """
+    Parse curl commands and stream them to `fp` as JSONL, without generating any code.
+    """
+    return dump_jsonl((parse_context(curl_command) for curl_command in curl_commands), fp)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request latency probe for httpx clients, inlined into the code generated with `instrument=True`.
+Each response logs a JSON line to stderr with its connect (including DNS), TLS, send, time-to-first-byte and download
+timings and its request/response sizes once it is closed, and a percentile summary of every phase is printed on exit.
+"""
+
+import atexit
+import json
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+TIMED_PHASES = ("connect", "tls", "send", "ttfb", "download", "total")
+# httpcore trace events, without their `.started`/`.complete`/`.failed` suffix
+TRACE_PHASES = {
+    "connection.connect_tcp": "connect",
+    "connection.connect_unix_socket": "connect",
+    "connection.start_tls": "tls",
+    "http11.send_request_headers": "send",
+    "http11.send_request_body": "send",
+    "http2.send_request_headers": "send",
+    "http2.send_request_body": "send",
+    "http11.receive_response_headers": "ttfb",
+    "http2.receive_response_headers": "ttfb",
+    "http11.receive_response_body": "download",
+    "http2.receive_response_body": "download",
+}
+TIMINGS = defaultdict(list)
+_timing_summary_installed = False
+
+
+class RequestTimer:
+    """
+    A httpcore `trace` extension adding up the time spent in each phase of one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self._phase_started = {}
+
+    def __call__(self, event_name, info):
+        name, _, stage = event_name.rpartition(".")
+        if name not in TRACE_PHASES:
+            return
+        if stage == "started":
+            self._phase_started[name] = time.perf_counter()
+        elif name in self._phase_started:
+            phase = TRACE_PHASES[name]
+            self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - self._phase_started.pop(name)
+
+    async def async_trace(self, event_name, info):
+        self(event_name, info)
+
+
+class TimedStream(httpx.SyncByteStream):
+    """
+    Wrap the stream of a response to record its timings when it is closed, once the caller has read (or dropped) it.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.stream = response.stream
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            record_timings(self.response)
+
+
+class AsyncTimedStream(httpx.AsyncByteStream):
+    def __init__(self, response):
+        self.response = response
+        self.stream = response.stream
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            record_timings(self.response)
+
+
+def start_timer(request):
+    request.extensions["trace"] = RequestTimer()
+
+
+async def async_start_timer(request):
+    request.extensions["trace"] = RequestTimer().async_trace
+
+
+def finish_timer(response):
+    # the body is left to the caller, so streamed responses stay streamed: timings are logged once it is closed
+    response.stream = TimedStream(response)
+
+
+async def async_finish_timer(response):
+    response.stream = AsyncTimedStream(response)
+
+
+def record_timings(response):
+    request = response.request
+    trace = request.extensions["trace"]
+    timer = getattr(trace, "__self__", trace)
+    phases = dict(timer.phases)
+    phases["total"] = time.perf_counter() - timer.started
+    for phase, seconds in phases.items():
+        TIMINGS[phase].append(seconds)
+    line = {
+        "method": request.method,
+        "url": str(request.url),
+        "status": response.status_code,
+        "http_version": response.http_version,
+        "request_bytes": int(request.headers.get("Content-Length", 0)),
+        "response_bytes": response.num_bytes_downloaded,
+        "timings_ms": {phase: round(phases[phase] * 1000, 3) for phase in TIMED_PHASES if phase in phases},
+    }
+    print(json.dumps(line), file=sys.stderr)
+
+
+def print_summary(file=None):
+    if not TIMINGS:
+        return
+    file = file or sys.stderr
+    print(f"{'phase':<10}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}", file=file)
+    for phase in TIMED_PHASES:
+        values = sorted(TIMINGS.get(phase, ()))
+        if values:
+            percentiles = [values[min(int(len(values) * q), len(values) - 1)] * 1000 for q in (0.5, 0.9, 0.99)]
+            cells = "".join(f"{value:>10.2f}" for value in [*percentiles, values[-1] * 1000])
+            print(f"{phase:<10}{len(values):>7}{cells}", file=file)
+
+
+def install():
+    """
+    Print the summary on exit. Safe to call more than once.
+    """
+    global _timing_summary_installed
+    if not _timing_summary_installed:
+        _timing_summary_installed = True
+        atexit.register(print_summary)
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Check that the code generated for curl commands sends the requests the commands describe.
+The code generated for each command by the ast and the string backends is run with its httpx calls routed to an
+in-process echo transport, next to a reference request built straight from the command's ParsedContext. The method, url,
+headers, cookies and body both of them sent are compared once normalized, and so are the proxy, TLS, HTTP/2, unix socket
+and proxy environment options of the transport each request went through. Commands are verified in batches over a pool
+of processes.
+Since both requests come from the same ParsedContext, this catches code generation errors, not parsing errors.
+"""
+
+import ast
+import builtins
+import contextlib
+import io
+import os
+import time
+import types
+import warnings
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from http.cookiejar import MozillaCookieJar
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .api import FormField, ParsedContext, bypasses_proxy, proxy_url
+from .api import unparse_context as unparse_string
+from .ast_api import unparse_context
+
+EchoedRequest = namedtuple(
+    "EchoedRequest", ["method", "url", "headers", "cookies", "body", "transport"], defaults=[None]
+)
+# how a request is sent: through which proxy, with which TLS, HTTP/2 and unix socket options, and whether the proxy
+# environment variables would be read
+TransportOptions = namedtuple("TransportOptions", ["proxy", "verify", "http2", "unix_socket", "trust_env"])
+# the backend is the one whose code failed or differs
+VerifyResult = namedtuple("VerifyResult", ["source", "differences", "error", "backend"], defaults=[None])
+
+DEFAULT_BATCH_SIZE = 100
+# the batches submitted to the pool per worker process before waiting for the oldest one
+BATCHES_IN_FLIGHT = 2
+# the longest value shown for a difference in the report
+MAX_REPORTED_LENGTH = 200
+# the httpx module-level functions, which take a few transport options a client's methods do not
+HTTPX_FUNCTIONS = ("request", "stream", "get", "options", "head", "post", "put", "patch", "delete")
+# the client options that change the request itself, the others only change how it is sent
+CLIENT_REQUEST_OPTIONS = ("cookies", "auth", "headers", "params")
+
+
+def normalize_request(request: Any) -> EchoedRequest:
+    """
+    The parts of a httpx request that reach the server: header names are lowercased and sorted, cookies are parsed, and
+    the random multipart boundary is replaced with a fixed one.
+    """
+    body = request.read()
+    headers = [(name.decode("latin-1").lower(), value.decode("latin-1")) for name, value in request.headers.raw]
+    boundary = request.headers.get("Content-Type", "").partition("boundary=")[2]
+    if boundary:
+        body = body.replace(boundary.encode("latin-1"), b"BOUNDARY")
+        headers = [(name, value.replace(boundary, "BOUNDARY")) for name, value in headers]
+    cookies = {}
+    for name, value in headers:
+        if name == "cookie":
+            for cookie in value.split(";"):
+                cookie_name, _, cookie_value = cookie.strip().partition("=")
+                cookies[cookie_name] = cookie_value
+    return EchoedRequest(
+        method=request.method,
+        url=str(request.url),
+        headers=sorted((name, value) for name, value in headers if name != "cookie"),
+        cookies=dict(sorted(cookies.items())),
+        body=body,
+    )
+
+
+def echo_transport(echoed: List[EchoedRequest], options: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    A httpx transport recording every request it gets in `echoed`, and answering them with an empty 200 response.
+    :param options: The `TransportOptions` fields recorded with each request, read when the request is sent.
+    """
+    import httpx
+
+    def echo(request: Any) -> Any:
+        echoed_request = normalize_request(request)
+        if options is not None:
+            echoed_request = echoed_request._replace(transport=TransportOptions(**options))
+        echoed.append(echoed_request)
+        # an unread stream, so that the generated code can stream it to a file
+        return httpx.Response(200, stream=httpx.ByteStream(b""))
+
+    return httpx.MockTransport(echo)
+
+
+class UnsavedCookieJar(MozillaCookieJar):
+    """
+    Load cookie files like the generated code does, but never write them.
+    """
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+
+def sandboxed_open(file: str, mode: str = "r", *args: Any, **kwargs: Any) -> IO:
+    """
+    Discard what the generated code writes, and read missing upload files as empty ones.
+    """
+    if any(flag in mode for flag in "wax+") or not os.path.exists(file):
+        placeholder = io.BytesIO() if "b" in mode else io.StringIO()
+        # httpx names uploaded files after their path
+        placeholder.name = file
+        return placeholder
+    return open(file, mode, *args, **kwargs)
+
+
+def _httpx_function(make_client: Callable[..., Any], method: str) -> Any:
+    """
+    A httpx module-level function, which sends its request with a client of its own like httpx does.
+    """
+
+    def call(*args: Any, verify: Any = True, cert: Any = None, proxy: Any = None, trust_env: Any = True, **kwargs: Any):
+        with make_client(verify=verify, proxy=proxy, trust_env=trust_env) as client:
+            return getattr(client, method)(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def stream(
+        *args: Any, verify: Any = True, cert: Any = None, proxy: Any = None, trust_env: Any = True, **kwargs: Any
+    ):
+        with make_client(verify=verify, proxy=proxy, trust_env=trust_env) as client:
+            with client.stream(*args, **kwargs) as response:
+                yield response
+
+    return stream if method == "stream" else call
+
+
+def sandbox(echoed: List[EchoedRequest]) -> Dict[str, Any]:
+    """
+    The globals to run generated code with: `httpx` requests are recorded in `echoed` by echo transports, which keep
+    the proxy, TLS, unix socket and HTTP/2 options they were created with, and files and cookie jars are not written.
+    """
+    import httpx
+
+    # the options of the transports created for the next client, which sets their trust_env
+    created: List[Dict[str, Any]] = []
+
+    def transport(proxy: Any = None, verify: Any = True, http2: bool = False, uds: Any = None, **_: Any) -> Any:
+        options = {"proxy": proxy, "verify": verify, "http2": http2, "unix_socket": uds, "trust_env": True}
+        created.append(options)
+        return echo_transport(echoed, options)
+
+    def client(**options: Any) -> Any:
+        kept = {name: value for name, value in options.items() if name in CLIENT_REQUEST_OPTIONS}
+        tls = {"verify": options.get("verify", True), "http2": options.get("http2", False)}
+        # like httpx, a client given a transport ignores its own verify and http2 options
+        default = options.get("transport") or transport(**tls)
+        mounts = dict(options.get("mounts") or {})
+        if options.get("proxy"):
+            mounts["all://"] = transport(proxy=options["proxy"], **tls)
+        for created_options in created:
+            created_options["trust_env"] = options.get("trust_env", True)
+        created.clear()
+        # the environment is never read, the option is only recorded
+        return httpx.Client(transport=default, mounts=mounts, trust_env=False, **kept)
+
+    fake_httpx = types.SimpleNamespace(
+        Client=client,
+        HTTPTransport=transport,
+        **{method: _httpx_function(client, method) for method in HTTPX_FUNCTIONS},
+    )
+    modules = {
+        "httpx": fake_httpx,
+        "http": types.SimpleNamespace(cookiejar=types.SimpleNamespace(MozillaCookieJar=UnsavedCookieJar)),
+        "os": types.SimpleNamespace(path=os.path, makedirs=lambda *args, **kwargs: None),
+    }
+
+    def sandboxed_import(name: str, *args: Any, **kwargs: Any) -> Any:
+        module = modules.get(name.partition(".")[0])
+        return module if module is not None else builtins.__import__(name, *args, **kwargs)
+
+    sandboxed_builtins = {**vars(builtins), "__import__": sandboxed_import, "open": sandboxed_open}
+    return {"__builtins__": sandboxed_builtins, "httpx": fake_httpx}
+
+
+def expected_transport(parsed_context: ParsedContext) -> Dict[str, Any]:
+    """
+    The `TransportOptions` fields curl would send the request with.
+    """
+    proxied = not bypasses_proxy(parsed_context.url, parsed_context.proxy)
+    return {
+        "proxy": proxy_url(parsed_context.proxy) if proxied else None,
+        "verify": parsed_context.verify,
+        "http2": parsed_context.http2,
+        # a proxied request connects to the proxy rather than to the unix socket
+        "unix_socket": None if proxied else parsed_context.unix_socket or None,
+        "trust_env": parsed_context.proxy is None,
+    }
+
+
+def _reference_file(field: FormField) -> Tuple[Any, ...]:
+    content = sandboxed_open(field.path, "rb") if field.path else field.value
+    return (field.filename, content, field.content_type) if field.content_type else (field.filename, content)
+
+
+def send_reference(parsed_context: ParsedContext, transport: Any) -> None:
+    """
+    Send the request described by a ParsedContext with httpx directly, without generating any code.
+    """
+    import httpx
+
+    jar = UnsavedCookieJar()
+    if parsed_context.cookie_file and os.path.exists(parsed_context.cookie_file):
+        jar.load(parsed_context.cookie_file, ignore_discard=True, ignore_expires=True)
+    with httpx.Client(transport=transport, cookies=jar) as client:
+        client.request(
+            parsed_context.method.upper(),
+            parsed_context.url,
+            headers=parsed_context.headers,
+            cookies=parsed_context.cookies or None,
+            params=parsed_context.params or None,
+            content=parsed_context.content or None,
+            json=ast.literal_eval(parsed_context.json) if parsed_context.json else None,
+            files=[(field.name, _reference_file(field)) for field in parsed_context.form_data] or None,
+            auth=tuple(parsed_context.auth) if parsed_context.auth else None,
+        )
+
+
+def compare(generated: List[EchoedRequest], reference: EchoedRequest) -> Dict[str, Tuple[Any, Any]]:
+    """
+    The fields that differ between the requests sent by the generated code and the reference request.
+    :return: A mapping of field names to the generated and the expected values.
+    """
+    if len(generated) != 1:
+        return {"requests": (len(generated), 1)}
+    return {
+        field: (getattr(generated[0], field), getattr(reference, field))
+        for field in EchoedRequest._fields
+        if getattr(generated[0], field) != getattr(reference, field)
+    }
+
+
+def verify_context(parsed_context: ParsedContext, source: str = "") -> VerifyResult:
+    """
+    Run the code generated for a ParsedContext and compare what it sends with the reference request.
+    """
+    with warnings.catch_warnings():
+        # both pass cookies per request, which httpx deprecates
+        warnings.simplefilter(action="ignore", category=DeprecationWarning)
+        return _verify(parsed_context, source)
+
+
+def _verify(parsed_context: ParsedContext, source: str) -> VerifyResult:
+    reference: List[EchoedRequest] = []
+    # anything can go wrong in the generated code, so every exception is reported rather than raised
+    try:
+        send_reference(parsed_context, echo_transport(reference, expected_transport(parsed_context)))
+    except Exception as error:
+        return VerifyResult(source=source, differences={}, error=f"reference request failed: {error!r}")
+    for backend, unparse in (("ast", unparse_context), ("string", unparse_string)):
+        generated: List[EchoedRequest] = []
+        try:
+            code = compile(unparse(parsed_context), source or "<generated>", "exec")
+            exec(code, sandbox(generated))
+        except Exception as error:
+            return VerifyResult(
+                source=source, differences={}, error=f"generated code failed: {error!r}", backend=backend
+            )
+        differences = compare(generated, reference[0])
+        if differences:
+            return VerifyResult(source=source, differences=differences, error=None, backend=backend)
+    return VerifyResult(source=source, differences={}, error=None)
+
+
+def verify_batch(requests: List[Tuple[str, ParsedContext]]) -> List[VerifyResult]:
+    return [verify_context(parsed_context, source) for source, parsed_context in requests]
+
+
+def verify_contexts(
+    requests: Iterable[Tuple[str, ParsedContext]],
+    processes: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[VerifyResult]:
+    """
+    Verify the generated code of many requests, spreading batches of them over a pool of processes.
+    Results are streamed in the order the requests were given, and requests are only read as workers free up.
+    :param requests: Pairs of a label for the report (e.g. the file and line of the command) and a ParsedContext.
+    :param processes: The number of worker processes, defaults to the number of CPUs. Use 1 to verify in-process.
+    :param batch_size: The number of requests sent to a worker at once.
+    """
+    requests = iter(requests)
+    batches = iter(lambda: list(islice(requests, batch_size)), [])
+    if processes == 1:
+        for batch in batches:
+            yield from verify_batch(batch)
+        return
+    window = BATCHES_IN_FLIGHT * (processes or os.cpu_count() or 1)
+    pending: deque = deque()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for batch in batches:
+            pending.append(executor.submit(verify_batch, batch))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _shorten(value: Any) -> str:
+    text = repr(value)
+    return text if len(text) <= MAX_REPORTED_LENGTH else f"{text[:MAX_REPORTED_LENGTH]}..."
+
+
+def report(results: Iterable[VerifyResult], file: IO[str]) -> Counter:
+    """
+    Print the requests that differ or fail as they come, then a summary line.
+    :return: The number of `equivalent`, `different` and `failed` requests, and of differences per field.
+    """
+    started = time.perf_counter()
+    counts: Counter = Counter(equivalent=0, different=0, failed=0)
+    for result in results:
+        location = f"{result.source} ({result.backend} backend)" if result.backend else result.source
+        if result.error:
+            counts["failed"] += 1
+            print(f"# {location}: {result.error}", file=file)
+        elif result.differences:
+            counts["different"] += 1
+            for field, (generated, expected) in result.differences.items():
+                counts[field] += 1
+                print(
+                    f"# {location}: {field} differ: got {_shorten(generated)}, expected {_shorten(expected)}",
+                    file=file,
+                )
+        else:
+            counts["equivalent"] += 1
+    fields = ", ".join(f"{field}: {counts[field]}" for field in ("requests", *EchoedRequest._fields) if counts[field])
+    total = counts["equivalent"] + counts["different"] + counts["failed"]
+    print(
+        f"# verified {total} requests in {time.perf_counter() - started:.1f}s: {counts['equivalent']} equivalent, "
+        f"{counts['different']} different{f' ({fields})' if fields else ''}, {counts['failed']} failed",
+        file=file,
+    )
+    return counts